@@ -1,12 +1,40 @@
 from django.contrib import admin
-from .models import Artwork, CommissionRequest, PayPalAccount, ModelApplication, ModelImage, SiteSettings
+from django.utils.html import format_html
+from .models import Artwork, Checkout, CommissionRequest, DerivativeJob, OutboundEmail, PayPalAccount, ModelApplication, ModelImage, SiteSettings
 
 @admin.register(Artwork)
 class ArtworkAdmin(admin.ModelAdmin):
-    list_display = ('title', 'status', 'medium', 'category', 'price', 'created_at')
+    list_display = ('preview', 'title', 'status', 'medium', 'category', 'price', 'created_at')
     list_filter = ('status', 'medium', 'category')
     search_fields = ('title', 'description')
 
+    @admin.display(description='Preview')
+    def preview(self, obj):
+        if not obj.image:
+            return ''
+        return format_html('<img src="{}" width="60" loading="lazy">', obj.resized_url(120))
+
+@admin.register(DerivativeJob)
+class DerivativeJobAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'duration_ms', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('artwork__title', 'model_image__application__name')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'duration_ms', 'last_error')
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    readonly_fields = ('created_at', 'started_at', 'sent_at', 'last_error')
+
+@admin.register(Checkout)
+class CheckoutAdmin(admin.ModelAdmin):
+    list_display = ('order_id', 'artwork', 'outcome', 'customer_name', 'customer_email', 'created_at')
+    list_filter = ('outcome',)
+    search_fields = ('order_id', 'customer_name', 'customer_email', 'artwork__title')
+    readonly_fields = ('order_id', 'artwork', 'outcome', 'created_at')
+
 @admin.register(CommissionRequest)
 class CommissionRequestAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'status', 'medium', 'category', 'budget', 'created_at')
@@ -35,6 +63,23 @@ class PayPalAccountAdmin(admin.ModelAdmin):
 class ModelImageInline(admin.TabularInline):
     model = ModelImage
     extra = 0
+    # Review from the small upright thumbnails; the originals are only a click away
+    fields = ('preview', 'original', 'uploaded_at')
+    readonly_fields = ('preview', 'original', 'uploaded_at')
+
+    def has_add_permission(self, request, obj=None):
+        # Photos arrive with the application form
+        return False
+
+    @admin.display(description='Preview')
+    def preview(self, obj):
+        if not obj.thumbnail:
+            return 'Thumbnail pending'
+        return format_html('<img src="{}" height="160" loading="lazy">', obj.thumbnail.url)
+
+    @admin.display(description='Original')
+    def original(self, obj):
+        return format_html('<a href="{}" target="_blank">{}</a>', obj.image.url, obj.image.name) if obj.image else ''
 
 @admin.register(ModelApplication)
 class ModelApplicationAdmin(admin.ModelAdmin):
@@ -0,0 +1,122 @@
+"""Async versions of the hot read views, routed when served over ASGI.
+
+They build the same querysets and templates as ``artwork.views``. Django's
+async ORM sends every query of a request through a single thread, one after
+the other, so the queries a page needs that don't depend on each other run
+through ``concurrently`` instead: each on a worker thread with its own
+database connection. The event loop is only held for the cache and
+conditional-request checks, so slow clients cost a coroutine rather than a
+worker.
+"""
+import asyncio
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.http import HttpResponse
+from django.shortcuts import aget_object_or_404, render
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+from . import views
+from .conditional import conditional_catalog
+from .facets import facet_counts, selection_from
+from .models import Artwork, PayPalAccount
+from .page_cache import cache_catalog_page
+from .pagination import keyset_columns
+from .serializers import ArtworkValuesSerializer
+
+# The routes that keep the synchronous views: commission, models, payment, media
+commission = views.commission
+models = views.models
+payment_success = views.payment_success
+resized_artwork = views.resized_artwork
+serve_media = views.serve_media
+
+arender = sync_to_async(render)
+
+
+def _isolated(call):
+    try:
+        return call()
+    finally:
+        # Worker threads outlive the request, so request_finished never closes these
+        connections.close_all()
+
+
+async def concurrently(*calls):
+    """Run the blocking ``calls`` at the same time; returns their results in order."""
+    return await asyncio.gather(*(sync_to_async(_isolated, thread_sensitive=False)(call) for call in calls))
+
+
+@conditional_catalog
+@cache_catalog_page
+async def home(request):
+    featured_artworks, latest_artworks = views.home_artworks(request.GET)
+    featured_artworks, latest_artworks, counts = await concurrently(
+        partial(list, featured_artworks),
+        partial(list, latest_artworks),
+        partial(facet_counts, selection_from(request.GET)),
+    )
+    return await arender(request, 'home.html', views.home_context(request.GET, featured_artworks, latest_artworks, counts))
+
+
+@conditional_catalog
+@cache_catalog_page
+async def artwork_detail(request, artwork_id):
+    artwork = await aget_object_or_404(Artwork, id=artwork_id)
+    paypal_account, similar_artworks = await concurrently(
+        PayPalAccount.get_active_account,
+        partial(views.similar_to, artwork),
+    )
+    return await arender(request, 'artwork_detail.html', {
+        'artwork': artwork,
+        'paypal_account': paypal_account,
+        'similar_artworks': similar_artworks
+    })
+
+
+@conditional_catalog
+@cache_catalog_page
+async def gallery(request):
+    # Building a search queryset may look up the full-text table, so it happens off the loop too
+    (page, next_page_url), counts = await concurrently(
+        lambda: views.gallery_page(views.gallery_artworks(request.GET), request.GET),
+        partial(facet_counts, selection_from(request.GET), request.GET.get('search')),
+    )
+    return await arender(request, 'gallery.html', views.gallery_context(request.GET, page, next_page_url, counts))
+
+
+artwork_api = views.ArtworkViewSet.as_view({'get': 'list', 'post': 'create'})
+
+
+def _list_page(viewset, request):
+    serializer = ArtworkValuesSerializer(request.query_params.get('fields'), viewset.get_serializer_context())
+    queryset = viewset.filter_queryset(viewset.get_queryset())
+    queryset = serializer.values(queryset, *keyset_columns(queryset))
+    page = viewset.paginate_queryset(queryset)
+    if page is not None:
+        return viewset.get_paginated_response(serializer.serialize(page)).data
+    return serializer.serialize(queryset)
+
+
+@csrf_exempt
+@conditional_catalog
+async def artwork_list(request):
+    """``GET /api/artwork/`` as JSON; creates and the browsable API go to ``ArtworkViewSet``."""
+    if request.method != 'GET' or 'text/html' in request.headers.get('Accept', ''):
+        return await sync_to_async(artwork_api)(request)
+
+    drf_request = Request(request)
+    viewset = views.ArtworkViewSet(request=drf_request, args=(), kwargs={}, format_kwarg=None, action='list')
+    try:
+        data = await sync_to_async(_list_page)(viewset, drf_request)
+        status = 200
+    except APIException as exc:
+        response = exception_handler(exc, {'view': viewset, 'request': drf_request})
+        data, status = response.data, response.status_code
+    response = HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+    patch_vary_headers(response, ['Accept'])
+    return response
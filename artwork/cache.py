@@ -0,0 +1,117 @@
+"""Version stamps for cached catalog data.
+
+Cached entries embed the current version in their keys, so bumping the
+version invalidates them all at once without tracking individual keys. The
+stamps live in the shared ``versions`` cache, which keeps processes and workers
+in step and, unlike the default cache, never holds enough entries to cull them.
+
+Site configuration (settings singleton, PayPal account) is additionally held
+in process memory and only checked against the site stamp every
+``ARTWORK_CONFIG_CHECK_INTERVAL`` seconds, so it costs no queries and no
+cache reads on most requests.
+"""
+import time
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+
+CATALOG = 'catalog'
+# Site settings and the PayPal account, which every page renders from
+SITE = 'site'
+
+# name -> (site version, time checked, value)
+_site_objects = {}
+
+# How long a bump may hold the stamp's lock before another takes over, in seconds
+BUMP_LOCK_TIMEOUT = 5
+BUMP_WAIT_TIMEOUT = 1.0
+BUMP_WAIT_INTERVAL = 0.01
+
+
+def _cache():
+    return caches['versions']
+
+
+def _key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    cache = _cache()
+    version = cache.get(_key(name))
+    if version is None:
+        # Seeded from the clock so a lost stamp never revives entries cached under an older one
+        cache.add(_key(name), int(time.time() * 1000), timeout=None)
+        version = cache.get(_key(name))
+    return version
+
+
+def bump_version(name):
+    # Not cache.incr(): it writes the stamp back with the default timeout, so
+    # the stamp would expire and reset. Bumps are serialised with a lock
+    # instead, so two of them never land on the same version.
+    cache = _cache()
+    key = _key(name)
+    deadline = time.monotonic() + BUMP_WAIT_TIMEOUT
+    while not cache.add(f'{key}:lock', 1, BUMP_LOCK_TIMEOUT) and time.monotonic() < deadline:
+        time.sleep(BUMP_WAIT_INTERVAL)
+    try:
+        version = cache.get(key)
+        if version is None:
+            # No stamp yet: a fresh clock-seeded one is newer than any before it
+            version = get_version(name)
+        else:
+            version += 1
+            cache.set(key, version, timeout=None)
+        cache.set(f'{key}:changed_at', time.time(), timeout=None)
+    finally:
+        cache.delete(f'{key}:lock')
+    return version
+
+
+def changed_within(seconds, names=(CATALOG, SITE)):
+    """Whether any of the ``names`` stamps was bumped in the last ``seconds``."""
+    changed = _cache().get_many([f'{_key(name)}:changed_at' for name in names])
+    return any(time.time() - changed_at < seconds for changed_at in changed.values())
+
+
+def catalog_version():
+    return get_version(CATALOG)
+
+
+def bump_catalog_version():
+    return bump_version(CATALOG)
+
+
+def site_version():
+    return get_version(SITE)
+
+
+def static_version():
+    """Digest of the static files manifest, so pages follow a deploy's new asset URLs."""
+    return getattr(staticfiles_storage, 'manifest_hash', '')
+
+
+def bump_site_version():
+    # This process sees its own writes at once; others within the check interval
+    _site_objects.clear()
+    return bump_version(SITE)
+
+
+def site_cached(name, load):
+    """``load()``, kept in this process until the site version changes.
+
+    The result is shared between requests and must be treated as read-only.
+    """
+    now = time.monotonic()
+    entry = _site_objects.get(name)
+    if entry is not None and now - entry[1] < settings.ARTWORK_CONFIG_CHECK_INTERVAL:
+        return entry[2]
+    version = site_version()
+    if entry is not None and entry[0] == version:
+        _site_objects[name] = (version, now, entry[2])
+        return entry[2]
+    # Read the version first: a write during load() leaves an entry that fails the next check
+    value = load()
+    _site_objects[name] = (version, now, value)
+    return value
@@ -0,0 +1,81 @@
+"""Background rendering of artwork derivatives.
+
+The functions in this module run inside ``ProcessPoolExecutor`` workers, so
+they import models lazily: a spawned worker has to call ``django.setup()``
+before anything touching the app registry is imported. Callers must close
+their database connections before starting the pool so that forked workers
+open their own.
+"""
+import os
+import time
+import traceback
+
+
+def init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portfolio.settings')
+    import django
+    django.setup()
+
+
+def render_artwork(artwork_id):
+    """Render missing derivatives for one artwork.
+
+    Returns ``(artwork_id, duration_ms, error)`` where ``error`` is an empty
+    string on success.
+    """
+    from .models import Artwork
+
+    started = time.monotonic()
+    try:
+        artwork = Artwork.objects.get(pk=artwork_id)
+        artwork.generate_derivatives()
+        error = ''
+    except Exception:
+        error = traceback.format_exc()
+    duration_ms = int((time.monotonic() - started) * 1000)
+    return artwork_id, duration_ms, error
+
+
+def render_model_image(image_id):
+    """Render the review thumbnail for one model application photo.
+
+    Returns ``(image_id, duration_ms, error)`` like ``render_artwork``.
+    """
+    from .models import ModelImage
+
+    started = time.monotonic()
+    try:
+        ModelImage.objects.get(pk=image_id).generate_thumbnail()
+        error = ''
+    except Exception:
+        error = traceback.format_exc()
+    duration_ms = int((time.monotonic() - started) * 1000)
+    return image_id, duration_ms, error
+
+
+def render_artwork_fields(artwork_id):
+    """Re-render one artwork's derivatives without saving the row.
+
+    Returns ``(artwork_id, image, fields, duration_ms, error)`` where ``image``
+    is the name of the image rendered and ``fields`` maps
+    ``Artwork.DERIVATIVE_FIELDS`` to their new database values, for the parent
+    process to store unless the image has been replaced since.
+    """
+    from django.db.models.fields.files import FieldFile
+    from .models import Artwork
+
+    started = time.monotonic()
+    image = fields = None
+    try:
+        artwork = Artwork.objects.get(pk=artwork_id)
+        image = artwork.image.name
+        artwork.render_derivative_files()
+        fields = {}
+        for name in Artwork.DERIVATIVE_FIELDS:
+            value = getattr(artwork, name)
+            fields[name] = value.name if isinstance(value, FieldFile) else value
+        error = ''
+    except Exception:
+        error = traceback.format_exc()
+    duration_ms = int((time.monotonic() - started) * 1000)
+    return artwork_id, image, fields, duration_ms, error
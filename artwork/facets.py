@@ -0,0 +1,57 @@
+"""Counts for the status/medium/category filters.
+
+One grouped query (at most a dozen rows) is cached per catalog version and
+search term; the counts for any selection are then summed in Python. Each
+facet is counted with the selection on the *other* facets applied, so every
+option shows how many artworks choosing it would return.
+"""
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from . import search
+from .cache import catalog_version
+from .models import Artwork
+
+FACETS = {
+    'status': Artwork.STATUS_CHOICES,
+    'medium': Artwork.MEDIUM_CHOICES,
+    'category': Artwork.CATEGORY_CHOICES,
+}
+
+
+def selection_from(params):
+    """``{facet: {values}}`` from query parameters; ``all`` and blanks select nothing."""
+    return {facet: {v for v in params.getlist(facet) if v and v != 'all'} for facet in FACETS}
+
+
+def grouped_counts(search_query=None):
+    digest = hashlib.md5((search_query or '').encode()).hexdigest()
+    key = f'facets:{catalog_version()}:{digest}'
+    rows = cache.get(key)
+    if rows is None:
+        queryset = Artwork.objects.all()
+        if search_query:
+            queryset = search.search(queryset, search_query)
+        rows = list(queryset.order_by().values(*FACETS).annotate(count=Count('id')))
+        cache.set(key, rows, settings.ARTWORK_FACET_CACHE_TIMEOUT)
+    return rows
+
+
+def facet_counts(selection, search_query=None):
+    """``{facet: {value: count, 'all': count}, 'total': count}`` for ``selection``."""
+    rows = grouped_counts(search_query)
+
+    def matches(row, skip=None):
+        return all(row[facet] in values for facet, values in selection.items() if values and facet != skip)
+
+    counts = {}
+    for facet, choices in FACETS.items():
+        values = {value: 0 for value, _ in choices}
+        for row in rows:
+            if matches(row, skip=facet):
+                values[row[facet]] = values.get(row[facet], 0) + row['count']
+        values['all'] = sum(values.values())
+        counts[facet] = values
+    counts['total'] = sum(row['count'] for row in rows if matches(row))
+    return counts
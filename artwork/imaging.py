@@ -0,0 +1,182 @@
+"""Single-decode derivative engine for artwork images.
+
+The original is opened once and decoded at the smallest scale that still
+covers the largest requested width: JPEG sources use draft mode so libjpeg
+does the DCT downscale while decoding, and every resize uses Pillow's
+``reducing_gap`` so ``Image.reduce`` does the cheap integer shrink before the
+final LANCZOS pass. Every rendition and the thumbnail are cut from that one
+decoded image, in JPEG plus whichever of WebP and AVIF this Pillow build can
+encode.
+
+Derivatives are content-addressed: ``derivative_key`` hashes the source bytes
+together with every transform parameter, so an identical upload reuses the
+files already on disk and a changed transform never overwrites a URL that
+browsers may have cached.
+"""
+import base64
+import hashlib
+from io import BytesIO
+from PIL import Image, ImageOps, features
+from .features import embed
+
+# Shrink with Image.reduce() until within this factor of the target size
+REDUCING_GAP = 3.0
+
+# Bump when the rendering code changes in a way that alters output pixels
+ENGINE_VERSION = 1
+
+# Width of the blurred low-quality placeholder inlined into pages
+PLACEHOLDER_WIDTH = 16
+
+# format key -> (Pillow format, MIME type, file extension, encoder options)
+FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg', {'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'image/webp', 'webp', {'method': 4}),
+    'avif': ('AVIF', 'image/avif', 'avif', {'speed': 6}),
+}
+
+
+def available_formats(requested):
+    """Filter ``requested`` down to the formats Pillow can encode here."""
+    return [fmt for fmt in requested if fmt == 'jpeg' or (fmt in FORMATS and features.check(fmt))]
+
+
+def source_digest(fileobj):
+    """SHA-256 of a Django ``File``, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in fileobj.chunks():
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def derivative_key(digest, fmt, **params):
+    """Stable name for the derivative of ``digest`` produced with ``params``."""
+    spec = ';'.join(f'{k}={params[k]}' for k in sorted(params))
+    token = f'{digest}|{fmt}|{spec}|v{ENGINE_VERSION}'
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+def image_size(source):
+    """Read the pixel size from the image header without decoding."""
+    with Image.open(source) as img:
+        size = img.size
+    source.seek(0)
+    return size
+
+
+def plan_renditions(original_size, widths):
+    """``(width, height)`` pairs for a ladder, clamped to the original width."""
+    original_width, original_height = original_size
+    return [
+        (width, max(1, round(original_height * width / original_width)))
+        for width in sorted({min(w, original_width) for w in widths})
+    ]
+
+
+def encode(img, fmt, quality):
+    pillow_format, _, _, options = FORMATS[fmt]
+    buffer = BytesIO()
+    img.save(buffer, format=pillow_format, quality=quality, **options)
+    return buffer.getvalue()
+
+
+def decode(source, max_width):
+    """Open ``source`` and decode it just large enough for ``max_width``.
+
+    Returns ``(image, original_size)``.
+    """
+    with Image.open(source) as img:
+        original_size = img.size
+        width = min(max_width, img.width)
+        height = max(1, round(img.height * width / img.width))
+        mode = 'L' if img.mode in ('1', 'L', 'LA', 'I', 'I;16') else 'RGB'
+        # No-op for anything other than JPEG
+        img.draft(mode, (width, height))
+        decoded = img.convert(mode)
+    return decoded, original_size
+
+
+def summarize(img):
+    """Low-quality placeholder (a data URI) and dominant colour (``#rrggbb``)."""
+    height = max(1, round(img.height * PLACEHOLDER_WIDTH / img.width))
+    tiny = img.convert('RGB').resize((PLACEHOLDER_WIDTH, height), Image.Resampling.BOX, reducing_gap=REDUCING_GAP)
+    # WebP keeps the inlined placeholder to a few dozen bytes instead of ~600
+    fmt = 'webp' if available_formats(['webp']) else 'jpeg'
+    data = base64.b64encode(encode(tiny, fmt, 40)).decode('ascii')
+    placeholder = f'data:{FORMATS[fmt][1]};base64,{data}'
+
+    # The most common colour after quantizing a small copy to a few buckets
+    palette_source = tiny.resize((64, max(1, round(64 * height / PLACEHOLDER_WIDTH))), Image.Resampling.BILINEAR)
+    quantized = palette_source.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+    return placeholder, f'#{r:02x}{g:02x}{b:02x}'
+
+
+def summarize_file(source):
+    """``summarize()`` plus the similarity embedding, from a small image file."""
+    with Image.open(source) as img:
+        img.draft('RGB', (PLACEHOLDER_WIDTH * 8, PLACEHOLDER_WIDTH * 8))
+        return (*summarize(img), embed(img))
+
+
+def render_derivatives(source, widths, thumbnail_size, quality):
+    """Render a width ladder and a thumbnail from a single decode.
+
+    ``quality`` maps each output format to its encoder quality. Widths wider
+    than the original are clamped to the original width rather than
+    upscaled. Returns a dict with ``original_size``, ``renditions`` (a list of
+    ``(width, height, {format: bytes})`` sorted by width), ``thumbnail``
+    (``(width, height, jpeg_bytes)``), ``placeholder``, ``dominant_color`` and
+    ``embedding``.
+    """
+    formats = available_formats(quality)
+    base, (original_width, original_height) = decode(source, max(widths))
+
+    renditions = []
+    for width, height in plan_renditions((original_width, original_height), widths):
+        if (width, height) == base.size:
+            resized = base
+        else:
+            resized = base.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+        encoded = {fmt: encode(resized, fmt, quality[fmt]) for fmt in formats}
+        renditions.append((width, height, encoded))
+
+    thumbnail = base.copy()
+    thumbnail.thumbnail(thumbnail_size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+    placeholder, dominant_color = summarize(thumbnail)
+
+    return {
+        'original_size': (original_width, original_height),
+        'placeholder': placeholder,
+        'dominant_color': dominant_color,
+        'embedding': embed(thumbnail),
+        'renditions': renditions,
+        'thumbnail': (thumbnail.width, thumbnail.height, encode(thumbnail, 'jpeg', quality['jpeg'])),
+    }
+
+
+def render_review_thumbnail(source, size, quality):
+    """Upright JPEG thumbnail of an uploaded photo, within ``size``.
+
+    Phone cameras store the sensor orientation in EXIF rather than rotating
+    pixels, so the orientation is applied before the pixels are thrown away.
+    Returns ``(width, height, jpeg_bytes)``.
+    """
+    with Image.open(source) as img:
+        # The bounding box either way up, since the rotation happens after the draft decode
+        img.draft('RGB', (max(size), max(size)))
+        upright = ImageOps.exif_transpose(img)
+    thumbnail = upright.convert('RGB')
+    thumbnail.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+    return thumbnail.width, thumbnail.height, encode(thumbnail, 'jpeg', quality)
+
+
+def render_width(source, width, fmt, quality):
+    """Render a single ``width`` of ``source`` in ``fmt`` (never upscaled)."""
+    base, (original_width, original_height) = decode(source, width)
+    [(width, height)] = plan_renditions((original_width, original_height), [width])
+    if (width, height) != base.size:
+        base = base.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+    return encode(base, fmt, quality)
@@ -0,0 +1,94 @@
+import os
+import tempfile
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from artwork.benchmarks import RENDITIONS, scratch_database, seed_artworks, timed
+from artwork.middleware import ENCODERS
+from artwork.models import Artwork
+
+LEVELS = {
+    'gzip': [1, 6, 9],
+    'br': [1, 4, 5, 6, 9, 11],
+}
+
+# Chunk size for the streaming rows, where each chunk is flushed as it is sent
+STREAM_CHUNK = 8 * 1024
+
+
+class Command(BaseCommand):
+    help = ('CPU cost against bytes saved for gzip and brotli at each level, on real catalog pages '
+            'and API responses rendered from a scratch database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Caches of its own, so no page comes from the real site's page cache
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={
+            alias: {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': os.path.join(directory, alias),
+            }
+            for alias in ('default', 'versions')
+        }):
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        with scratch_database():
+            seed_artworks(options['rows'])
+            Artwork.objects.update(
+                description='A study in graphite and oil. ' * 20,
+                tile_image='artwork/tiles/benchmark.jpg',
+                renditions=RENDITIONS,
+            )
+            artwork = Artwork.objects.order_by('id').first()
+            # No Accept-Encoding: the bodies come back uncompressed
+            client = Client(HTTP_HOST='localhost')
+            bodies = {}
+            for name, path in (
+                ('home page', '/'),
+                ('gallery page', '/gallery/'),
+                ('artwork page', f'/artwork/{artwork.pk}/'),
+                ('API, 20 rows', '/api/artwork/?format=json'),
+                ('API, 1000 rows', '/api/artwork/?format=json&page_size=1000'),
+            ):
+                response = client.get(path)
+                if response.status_code != 200:
+                    raise CommandError(f'{path} returned {response.status_code}')
+                bodies[name] = b''.join(response) if response.streaming else response.content
+        for name, body in bodies.items():
+            self.run(name, body, options['repeat'])
+
+    def run(self, name, body, repeat):
+        self.stdout.write(f'{name}: {len(body) / 1024:.1f}KB')
+        self.stdout.write(f"  {'encoding':<20}{'time':>10}{'size':>10}{'saved':>8}{'MB/s':>8}")
+        for encoding, levels in LEVELS.items():
+            if encoding not in ENCODERS:
+                self.stdout.write(f'  {encoding:<20}not installed')
+                continue
+            compress, stream = ENCODERS[encoding]
+            for level in levels:
+                self.row(f'{encoding} {level}', body, repeat, lambda: compress(body, level))
+            level = settings.ARTWORK_COMPRESS_LEVELS[encoding]
+            self.row(f'{encoding} {level}, streamed', body, repeat, lambda: self.stream(stream(level), body))
+
+        # What a page-cache hit costs instead: reading the stored compressed body
+        cache.set('benchmark_compression', ENCODERS['gzip'][0](body, 9), 60)
+        self.row('cached gzip 9 body', body, repeat, lambda: cache.get('benchmark_compression'))
+        cache.delete('benchmark_compression')
+
+    def stream(self, stream, body):
+        chunks = [stream.chunk(body[i:i + STREAM_CHUNK]) for i in range(0, len(body), STREAM_CHUNK)]
+        return b''.join(chunks) + stream.finish()
+
+    def row(self, label, body, repeat, fn):
+        compressed = fn()
+        ms = timed(fn, repeat)
+        self.stdout.write(
+            f'  {label:<20}{ms:>8.2f}ms{len(compressed) / 1024:>8.1f}KB'
+            f'{1 - len(compressed) / len(body):>8.0%}{len(body) / 1e6 / (ms / 1000):>8.0f}'
+        )
@@ -0,0 +1,120 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.test.utils import override_settings
+from artwork.benchmarks import scratch_database, seed_artworks
+from artwork.models import Artwork, CommissionRequest
+
+# (name, SQLite pragmas, CONN_MAX_AGE)
+CONFIGURATIONS = [
+    ('defaults', {}, 0),
+    ('persistent connections', {}, 60),
+    ('tuned', None, 60),  # ARTWORK_SQLITE_PRAGMAS
+]
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0
+
+
+class Command(BaseCommand):
+    help = ('Mixed catalog read / sale and commission write load from parallel threads, comparing '
+            'Django defaults with persistent connections and the tuned SQLite pragmas')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5)
+        parser.add_argument('--write-ratio', type=float, default=0.1,
+                            help='Share of simulated requests that write')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{options['threads']} threads, {options['write_ratio']:.0%} writes, "
+                          f"{options['duration']:g}s per configuration")
+        self.stdout.write(f"{'configuration':<24}{'req/s':>8}{'read p50':>10}{'read p99':>10}"
+                          f"{'write p50':>11}{'write p99':>11}{'errors':>8}")
+        for name, pragmas, max_age in CONFIGURATIONS:
+            if pragmas is None:
+                pragmas = settings.ARTWORK_SQLITE_PRAGMAS
+            with override_settings(ARTWORK_SQLITE_PRAGMAS=pragmas), tempfile.TemporaryDirectory() as directory:
+                # A fresh file per configuration: WAL mode sticks to the database file
+                name_override = os.path.join(directory, 'benchmark.sqlite3') if connection.vendor == 'sqlite' else None
+                with scratch_database(name=name_override):
+                    seed_artworks(options['rows'])
+                    connection.settings_dict['CONN_MAX_AGE'] = max_age
+                    try:
+                        self.report(name, self.run(options))
+                    finally:
+                        connection.settings_dict['CONN_MAX_AGE'] = settings.CONN_MAX_AGE
+
+    def run(self, options):
+        ids = list(Artwork.objects.values_list('id', flat=True))
+        connections.close_all()
+        stop_at = time.monotonic() + options['duration']
+        results = {'read': [], 'write': [], 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            reads, writes, errors = [], [], 0
+            while time.monotonic() < stop_at:
+                write = rng.random() < options['write_ratio']
+                started = time.perf_counter()
+                # Request boundaries, where Django closes connections older than CONN_MAX_AGE
+                close_old_connections()
+                try:
+                    if write:
+                        self.write(rng, ids)
+                    else:
+                        self.read(rng)
+                except OperationalError:
+                    errors += 1
+                    continue
+                finally:
+                    close_old_connections()
+                (writes if write else reads).append((time.perf_counter() - started) * 1000)
+            connections.close_all()
+            with lock:
+                results['read'] += reads
+                results['write'] += writes
+                results['errors'] += errors
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results['duration'] = options['duration']
+        return results
+
+    def read(self, rng):
+        # A gallery page: one filtered, ordered page of artwork
+        status = rng.choice(['FOR_SALE', 'SOLD', None])
+        queryset = Artwork.objects.order_by(*Artwork.SORT_ORDERINGS['newest'])
+        if status:
+            queryset = queryset.filter(status=status)
+        list(queryset.values('id', 'title', 'image', 'status', 'price')[:20])
+
+    def write(self, rng, ids):
+        with transaction.atomic():
+            if rng.random() < 0.5:
+                # A sale
+                Artwork.objects.filter(pk=rng.choice(ids), status='FOR_SALE').update(status='SOLD')
+            else:
+                CommissionRequest.objects.create(
+                    name='Benchmark', email='benchmark@example.com', description='Benchmark commission',
+                    medium='OIL', category='PORTRAIT', size='A3', budget=500,
+                )
+
+    def report(self, name, results):
+        reads, writes = sorted(results['read']), sorted(results['write'])
+        rate = (len(reads) + len(writes)) / results['duration']
+        self.stdout.write(
+            f'{name:<24}{rate:>8.0f}{percentile(reads, 50):>8.2f}ms{percentile(reads, 99):>8.2f}ms'
+            f"{percentile(writes, 50):>9.2f}ms{percentile(writes, 99):>9.2f}ms{results['errors']:>8}"
+        )
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+import numpy as np
+from artwork.imaging import render_derivatives
+
+
+def legacy_render(path):
+    """The tile and thumbnail code that used to live on Artwork."""
+    img = Image.open(path)
+    width = 400
+    ratio = width / float(img.size[0])
+    height = int(float(img.size[1]) * ratio)
+    img = img.resize((width, height), Image.Resampling.LANCZOS)
+    img.save(BytesIO(), format='JPEG', quality=85)
+
+    img = Image.open(path)
+    img.thumbnail((150, 150), Image.Resampling.LANCZOS)
+    img.save(BytesIO(), format='JPEG', quality=85)
+
+
+def engine_render(path, quality=None):
+    widths = set(settings.ARTWORK_DERIVATIVE_WIDTHS) | {settings.ARTWORK_TILE_WIDTH}
+    render_derivatives(path, widths, settings.ARTWORK_THUMBNAIL_SIZE, quality or settings.ARTWORK_DERIVATIVE_QUALITY)
+
+
+def engine_render_jpeg(path):
+    engine_render(path, {'jpeg': settings.ARTWORK_DERIVATIVE_QUALITY['jpeg']})
+
+
+def measure(renderer, path):
+    """Run one render in a fresh process; return (wall seconds, peak RSS growth in KiB)."""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    renderer(path)
+    elapsed = time.perf_counter() - started
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+
+
+class Command(BaseCommand):
+    help = 'Compare peak memory and wall time of the legacy and single-decode derivative paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('images', nargs='*', help='Image files to render')
+        parser.add_argument('--megapixels', type=int, default=50,
+                            help='Size of the synthetic JPEG used when no images are given')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        images = options['images']
+        if not images:
+            images = [self.synthetic_image(options['megapixels'])]
+
+        renderers = [('legacy', legacy_render), ('engine', engine_render_jpeg), ('all-fmt', engine_render)]
+        # Each run gets its own process so ru_maxrss reflects only that run
+        context = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+        for path in images:
+            with Image.open(path) as img:
+                self.stdout.write(f'{os.path.basename(path)} ({img.width}x{img.height} {img.format})')
+            for label, renderer in renderers:
+                runs = []
+                for _ in range(options['repeat']):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        runs.append(pool.submit(measure, renderer, path).result())
+                wall = min(r[0] for r in runs)
+                rss = max(r[1] for r in runs)
+                self.stdout.write(f'  {label:<8} wall {wall * 1000:8.0f} ms   peak RSS +{rss / 1024:7.1f} MiB')
+
+    def synthetic_image(self, megapixels):
+        width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+        height = width * 3 // 4
+        # Smooth gradients plus noise compress like a photographed canvas
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        noise = np.random.default_rng(0).integers(0, 32, (height, width), dtype=np.uint8)
+        channels = [(x + y) / 2, np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width))]
+        array = np.dstack([(c.astype(np.uint8) // 2 + noise) for c in channels])
+        path = os.path.join(tempfile.mkdtemp(), f'synthetic_{megapixels}mp.jpg')
+        Image.fromarray(array).save(path, quality=90)
+        self.stdout.write(f'Wrote synthetic test image {path}')
+        return path
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from artwork.benchmarks import scratch_database, seed_artworks, timed
+from artwork.models import Artwork
+from artwork.pagination import cursor_for, keyset_page
+
+
+class Command(BaseCommand):
+    help = 'Compare OFFSET and keyset pagination latency on a scratch database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--page', type=int, default=500, help='Deep page to compare with page 1')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(f"Seeding {options['rows']} artworks...")
+            seed_artworks(options['rows'])
+            self.run(options)
+
+    def run(self, options):
+        size, deep, repeat = options['page_size'], options['page'], options['repeat']
+        self.stdout.write(f"{'sort':<12}{'method':<8}{'page 1':>12}{f'page {deep}':>12}")
+        for sort, ordering in Artwork.SORT_ORDERINGS.items():
+            queryset = Artwork.objects.all()
+            if sort.startswith('price'):
+                queryset = queryset.exclude(status='NOT_AVAILABLE')
+            queryset = queryset.order_by(*ordering)
+
+            # What the numbered pages used to cost: COUNT(*) plus LIMIT/OFFSET
+            def offset_page(number):
+                page = Paginator(queryset, size).page(number)
+                return list(page.object_list)
+
+            # The cursor for the deep page is what the previous response handed out
+            boundary = queryset[(deep - 1) * size - 1]
+            deep_cursor = cursor_for(queryset, boundary)
+            assert keyset_page(queryset, deep_cursor, size)[0] == offset_page(deep)
+
+            for method, first, later in (
+                ('offset', lambda: offset_page(1), lambda: offset_page(deep)),
+                ('keyset', lambda: keyset_page(queryset, None, size), lambda: keyset_page(queryset, deep_cursor, size)),
+            ):
+                self.stdout.write(
+                    f'{sort:<12}{method:<8}{timed(first, repeat):>10.2f}ms{timed(later, repeat):>10.2f}ms'
+                )
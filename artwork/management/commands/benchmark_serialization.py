@@ -0,0 +1,57 @@
+import json
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from artwork.benchmarks import RENDITIONS, scratch_database, seed_artworks, timed
+from artwork.models import Artwork
+from artwork.serializers import CARD_FIELDS, ArtworkSerializer, ArtworkValuesSerializer
+
+TILE_FIELDS = ['id', 'title', 'tile_image', 'status', 'price']
+
+
+class Command(BaseCommand):
+    help = 'Compare ArtworkSerializer with the .values() list path: time and payload size per page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            seed_artworks(options['rows'])
+            Artwork.objects.update(
+                description='A study in graphite and oil. ' * 20,
+                tile_image='artwork/tiles/benchmark.jpg',
+                renditions=RENDITIONS,
+            )
+            self.run(options)
+
+    def run(self, options):
+        size, repeat = options['page_size'], options['repeat']
+        request = Request(APIRequestFactory().get('/api/artwork/', HTTP_HOST='localhost'))
+        context = {'request': request}
+        queryset = Artwork.objects.order_by(*Artwork.SORT_ORDERINGS['newest'])
+
+        def full():
+            return ArtworkSerializer(queryset[:size], many=True, context=context).data
+
+        def fast(fields=None):
+            serializer = ArtworkValuesSerializer(fields, context)
+            return serializer.serialize(serializer.values(queryset)[:size])
+
+        # Same output, or the comparison is meaningless
+        expected = json.loads(JSONRenderer().render(full()))
+        assert json.loads(JSONRenderer().render(fast())) == expected, 'values() rows render differently'
+
+        self.stdout.write(f'{size} rows per page')
+        self.stdout.write(f"{'path':<28}{'time':>10}{'payload':>12}")
+        for name, fn in (
+            ('ArtworkSerializer', full),
+            ('values(), all fields', fast),
+            ('values(), card fields', lambda: fast(','.join(CARD_FIELDS))),
+            ('values(), tile fields', lambda: fast(','.join(TILE_FIELDS))),
+        ):
+            payload = len(JSONRenderer().render(fn()))
+            self.stdout.write(f'{name:<28}{timed(fn, repeat):>8.2f}ms{payload / 1024:>10.1f}KB')
@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from artwork.cache import bump_catalog_version
+from artwork.similarity import rebuild, refresh_stale
+
+
+class Command(BaseCommand):
+    help = 'Recompute every precomputed similar-artwork list from the stored embeddings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale', action='store_true',
+                            help='Only refresh artworks flagged by saves since the last refresh')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['stale']:
+            count = refresh_stale()
+        else:
+            count = rebuild()
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} artwork(s) in {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from artwork.query_plans import SUPPORTED_VENDORS, explain, hot_queries
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN the hot catalog queries against the configured database and fail if any falls back '
+            'to a full scan plus sort')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show-plans', action='store_true')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SUPPORTED_VENDORS:
+            raise CommandError(f'EXPLAIN checks support {", ".join(SUPPORTED_VENDORS)}, not {connection.vendor}')
+        failures = []
+        for name, queryset in hot_queries():
+            plan, problems = explain(queryset)
+            if problems:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'FAIL {name}: {" + ".join(problems)}'))
+            else:
+                self.stdout.write(f'ok   {name}')
+            if problems or options['show_plans']:
+                self.stdout.write(f'{queryset.query}\n{plan}\n')
+        if failures:
+            raise CommandError(f'{len(failures)} query plan regression(s): ' + ', '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All query plans use an index'))
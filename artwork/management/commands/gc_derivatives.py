@@ -0,0 +1,51 @@
+import time
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from artwork.models import Artwork
+
+# Directories that only ever hold generated files
+DERIVATIVE_DIRS = [settings.ARTWORK_DERIVATIVE_ROOT, 'artwork/renditions', 'artwork/tiles', 'artwork/thumbnails']
+
+class Command(BaseCommand):
+    help = 'Delete derivative files that no artwork references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List orphans without deleting them')
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='Keep files younger than this many seconds (they may belong to a running job)')
+
+    def handle(self, *args, **options):
+        referenced = set()
+        for tile, thumbnail, renditions in Artwork.objects.values_list('tile_image', 'thumbnail_image', 'renditions'):
+            referenced.update(name for name in (tile, thumbnail) if name)
+            for entries in (renditions or {}).values():
+                referenced.update(entry['name'] for entry in entries)
+
+        cutoff = time.time() - options['min_age']
+        removed = freed = 0
+        for directory in DERIVATIVE_DIRS:
+            for name in self.walk(directory):
+                if name in referenced:
+                    continue
+                if default_storage.get_modified_time(name).timestamp() > cutoff:
+                    continue
+                size = default_storage.size(name)
+                if options['dry_run']:
+                    self.stdout.write(f'Would delete {name}')
+                else:
+                    default_storage.delete(name)
+                removed += 1
+                freed += size
+
+        verb = 'Would free' if options['dry_run'] else 'Freed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {freed / 1024 / 1024:.1f} MiB in {removed} orphaned file(s)'))
+
+    def walk(self, directory):
+        if not default_storage.exists(directory):
+            return
+        subdirs, files = default_storage.listdir(directory)
+        for name in files:
+            yield f'{directory}/{name}'
+        for subdir in subdirs:
+            yield from self.walk(f'{directory}/{subdir}')
@@ -1,35 +1,133 @@
 import os
 import random
-from django.core.management.base import BaseCommand
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files import File
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from artwork import search
+from artwork.cache import bump_catalog_version
+from artwork.imaging import source_digest
 from artwork.models import Artwork
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return source_digest(File(f))
+
+
 class Command(BaseCommand):
     help = 'Load artwork from the media/artwork directory'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true',
+                            help='Only add new files and refresh changed ones, keeping existing metadata')
+        parser.add_argument('--prune', action='store_true',
+                            help='With --sync, delete artworks whose file has disappeared')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='With --sync, show what would change without writing anything')
+        parser.add_argument('--batch-size', type=int, default=100, help='Rows per bulk_create')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes used to render derivatives')
+
     def handle(self, *args, **options):
         artwork_dir = os.path.join('media', 'artwork')
-        
+
+        # Get all image files
+        image_files = [f for f in os.listdir(artwork_dir) if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+        if options['sync']:
+            self.sync(artwork_dir, image_files, options)
+            return
+        if options['prune'] or options['dry_run']:
+            raise CommandError('--prune and --dry-run require --sync')
+
         # Clear existing artwork
         Artwork.objects.all().delete()
-        
-        # Get all image files
-        image_files = [f for f in os.listdir(artwork_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-        
+
+        for filename in image_files:
+            # Create artwork entry; saving queues its tile and thumbnail
+            artwork = Artwork.objects.create(**self.new_artwork_fields(filename))
+            self.stdout.write(self.style.SUCCESS(f'Created artwork: {artwork.title}'))
+
+    def new_artwork_fields(self, filename):
+        # Generate a random price between £50 and £1000
+        price = round(random.uniform(50, 1000), 2)
+        title = os.path.splitext(filename)[0]
+        return {
+            'title': title,
+            'description': f"A beautiful artwork titled {title}",
+            'image': f"artwork/{filename}",
+            'status': 'FOR_SALE',
+            'price': price,
+            'medium': 'OIL' if 'oil' in filename.lower() else 'GRAPHITE',
+            'category': 'PORTRAIT' if 'portrait' in filename.lower() else 'FIGURE',
+            'is_featured': False,
+        }
+
+    def sync(self, artwork_dir, image_files, options):
+        existing = {
+            image: (pk, image_hash)
+            for pk, image, image_hash in Artwork.objects.filter(image__startswith='artwork/')
+            .values_list('id', 'image', 'image_hash')
+            # Only files directly in media/artwork are managed by this command
+            if '/' not in image[len('artwork/'):]
+        }
+
+        # Hashing is I/O bound and hashlib releases the GIL, so threads suffice
+        paths = [os.path.join(artwork_dir, f) for f in image_files]
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            digests = dict(zip(image_files, pool.map(file_digest, paths)))
+
+        new, changed, unchanged = [], {}, 0
         for filename in image_files:
-            # Generate a random price between £50 and £1000
-            price = round(random.uniform(50, 1000), 2)
-            
-            # Create artwork entry
-            artwork = Artwork.objects.create(
-                title=os.path.splitext(filename)[0],
-                description=f"A beautiful artwork titled {os.path.splitext(filename)[0]}",
-                image=f"artwork/{filename}",
-                status='FOR_SALE',
-                price=price,
-                medium='OIL' if 'oil' in filename.lower() else 'GRAPHITE',
-                category='PORTRAIT' if 'portrait' in filename.lower() else 'FIGURE',
-                is_featured=False
+            name = f'artwork/{filename}'
+            if name not in existing:
+                new.append(filename)
+            elif existing[name][1] != digests[filename]:
+                changed[name] = existing[name][0]
+            else:
+                unchanged += 1
+        on_disk = {f'artwork/{f}' for f in image_files}
+        removed = {name: pk for name, (pk, _) in existing.items() if name not in on_disk}
+
+        for filename in new:
+            self.stdout.write(f'+ artwork/{filename}')
+        for name in changed:
+            self.stdout.write(f'~ {name}')
+        for name in removed:
+            self.stdout.write(f'- {name}' + ('' if options['prune'] else ' (kept, use --prune to delete)'))
+        self.stdout.write(
+            f'{len(new)} new, {len(changed)} changed, {unchanged} unchanged, {len(removed)} missing'
+        )
+        if options['dry_run']:
+            return
+
+        # bulk_create skips save(), so nothing is queued; derivatives are rendered below
+        Artwork.objects.bulk_create(
+            [Artwork(**self.new_artwork_fields(filename)) for filename in new],
+            batch_size=options['batch_size'],
+        )
+        # Not every backend returns primary keys from bulk_create
+        created = list(Artwork.objects.filter(image__in=[f'artwork/{f}' for f in new]).values_list('id', flat=True))
+        # bulk_create skips the signals that keep the search index current
+        search.reindex(Artwork, ids=created)
+
+        if options['prune'] and removed:
+            Artwork.objects.filter(id__in=removed.values()).delete()
+        # Publishes the new rows, shown with their original images until rendered.
+        # regenerate_derivatives bumps again as it writes, so pages cached in
+        # between don't keep the pre-derivative markup
+        bump_catalog_version()
+
+        to_render = created + list(changed.values())
+        if to_render:
+            call_command(
+                'regenerate_derivatives',
+                ids=','.join(str(pk) for pk in to_render),
+                workers=options['workers'],
+                restart=True,
+                stdout=self.stdout,
+                stderr=self.stderr,
             )
-            # Call save to generate tile and thumbnail images
-            artwork.save()
-            self.stdout.write(self.style.SUCCESS(f'Created artwork: {artwork.title}')) 
\ No newline at end of file
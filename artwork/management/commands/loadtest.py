@@ -0,0 +1,119 @@
+import http.client
+import itertools
+import socket
+import statistics
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = ['/', '/gallery/', '/api/artwork/?fields=id,title,srcset,status,price']
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = ('Load a running server (gunicorn, uvicorn, ...) with keep-alive clients and report '
+            'requests/sec and latency percentiles')
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Base URL of the server, e.g. http://127.0.0.1:8000')
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS,
+                            help='Paths requested in rotation (default: home, gallery, artwork list API)')
+        parser.add_argument('--concurrency', type=int, default=32, help='Simultaneous clients')
+        parser.add_argument('--duration', type=float, default=15, help='Seconds to run for')
+        parser.add_argument('--warmup', type=float, default=2, help='Seconds of load before measuring')
+        parser.add_argument('--bust', action='store_true',
+                            help='Add a unique query parameter to every request, bypassing the page cache and ETags')
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help='Extra connections that trickle their request headers for the whole run')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        self.host, self.port = url.hostname, url.port or 80
+        self.paths = options['paths']
+        self.bust = options['bust']
+        self.counter = itertools.count()
+        self.samples, self.statuses, self.errors = [], Counter(), Counter()
+        self.lock = threading.Lock()
+
+        now = time.monotonic()
+        self.measure_from = now + options['warmup']
+        self.stop_at = self.measure_from + options['duration']
+        threads = [threading.Thread(target=self.slow_client, daemon=True) for _ in range(options['slow_clients'])]
+        threads += [threading.Thread(target=self.client, args=(i,)) for i in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.report(options)
+
+    def client(self, offset):
+        connection = None
+        for i in itertools.count(offset):
+            if time.monotonic() >= self.stop_at:
+                break
+            path = self.paths[i % len(self.paths)]
+            if self.bust:
+                path += ('&' if '?' in path else '?') + f'_={next(self.counter)}'
+            started = time.monotonic()
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                connection.request('GET', path, headers={'Accept': 'text/html,application/json'})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException) as e:
+                status = None
+                if connection is not None:
+                    connection.close()
+                connection = None
+                error = type(e).__name__
+            finished = time.monotonic()
+            if started < self.measure_from:
+                continue
+            with self.lock:
+                if status is None:
+                    self.errors[error] += 1
+                else:
+                    self.statuses[status] += 1
+                    self.samples.append(finished - started)
+        if connection is not None:
+            connection.close()
+
+    def slow_client(self):
+        # Holds a connection open the way a client on a bad mobile link does
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=30)
+            sock.sendall(b'GET / HTTP/1.1\r\nHost: localhost\r\n')
+            while time.monotonic() < self.stop_at:
+                time.sleep(1)
+                sock.sendall(b'X-Slow: 1\r\n')
+            sock.close()
+        except OSError:
+            pass
+
+    def report(self, options):
+        samples = sorted(self.samples)
+        total = len(samples) + sum(self.errors.values())
+        self.stdout.write(f"{options['concurrency']} clients, {options['slow_clients']} slow clients, "
+                          f"{options['duration']:g}s{' (cache busting)' if self.bust else ''}")
+        self.stdout.write(f'requests      {total}')
+        self.stdout.write(f"requests/sec  {len(samples) / options['duration']:.1f}")
+        if samples:
+            self.stdout.write(f'latency p50   {percentile(samples, 50) * 1000:.1f}ms')
+            self.stdout.write(f'latency p95   {percentile(samples, 95) * 1000:.1f}ms')
+            self.stdout.write(f'latency p99   {percentile(samples, 99) * 1000:.1f}ms')
+            self.stdout.write(f'latency mean  {statistics.mean(samples) * 1000:.1f}ms')
+        self.stdout.write('statuses      ' + ', '.join(f'{status}: {n}' for status, n in sorted(self.statuses.items())))
+        if self.errors:
+            self.stdout.write(self.style.WARNING(
+                'errors        ' + ', '.join(f'{name}: {n}' for name, n in self.errors.most_common())
+            ))
@@ -0,0 +1,124 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+from artwork.derivatives import init_worker, render_artwork, render_model_image
+from artwork.models import DerivativeJob
+from artwork.similarity import refresh_stale
+
+# Seconds between prunes of finished jobs while the worker runs
+PRUNE_INTERVAL = 60 * 60
+
+class Command(BaseCommand):
+    help = ('Render queued tile and thumbnail images in a pool of worker processes, '
+            'then refresh the similar-artwork lists they changed')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=20,
+                            help='Jobs claimed from the queue per round')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Requeue jobs that have been running for this many seconds')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when no jobs are due instead of polling')
+        parser.add_argument('--keep-done', type=int, default=7,
+                            help='Days finished jobs are kept for --stats before being deleted')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print queue depth and job timings, then exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+
+        requeued = DerivativeJob.requeue_stale(timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+
+        self.prune(options)
+        pool = self.start_pool(options)
+        try:
+            while True:
+                jobs = DerivativeJob.claim(options['batch_size'])
+                # Once per batch rather than per job: every refresh loads all embeddings
+                self.refresh_similarity()
+                if not jobs:
+                    if options['once']:
+                        break
+                    if time.monotonic() - self.pruned_at > PRUNE_INTERVAL:
+                        self.prune(options)
+                    time.sleep(options['poll_interval'])
+                    continue
+                if not self.run_batch(pool, jobs):
+                    self.stdout.write(self.style.WARNING('A worker process died; restarting the pool'))
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self.start_pool(options)
+        finally:
+            pool.shutdown()
+
+        self.print_stats()
+
+    def start_pool(self, options):
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker)
+
+    def prune(self, options):
+        self.pruned_at = time.monotonic()
+        deleted = DerivativeJob.prune(timedelta(days=options['keep_done']))
+        if deleted:
+            self.stdout.write(f'Deleted {deleted} finished job(s)')
+
+    def run_batch(self, pool, jobs):
+        """Run ``jobs`` in ``pool``; returns False if the pool broke and must be replaced."""
+        connections.close_all()
+        futures = [
+            pool.submit(render_artwork, job.artwork_id) if job.artwork_id
+            else pool.submit(render_model_image, job.model_image_id)
+            for job in jobs
+        ]
+        intact = True
+        for job, future in zip(jobs, futures):
+            try:
+                _, duration_ms, error = future.result()
+            except BrokenProcessPool:
+                # e.g. OOM-killed on a huge image. Every unfinished job in the batch
+                # fails with it, as there's no telling which one did it; retries
+                # are backed off and the culprit ends up FAILED after MAX_ATTEMPTS
+                intact = False
+                duration_ms = int((timezone.now() - job.started_at).total_seconds() * 1000)
+                error = 'The worker process running this job (or another in its batch) died'
+            if error:
+                job.mark_failed(duration_ms, error)
+                self.stdout.write(self.style.ERROR(
+                    f'{job.subject}: attempt {job.attempts} failed after {duration_ms} ms '
+                    f'({job.get_status_display()})\n{error}'
+                ))
+            else:
+                job.mark_done(duration_ms)
+                self.stdout.write(self.style.SUCCESS(f'{job.subject}: done in {duration_ms} ms'))
+        return intact
+
+    def refresh_similarity(self):
+        count = refresh_stale()
+        if count:
+            self.stdout.write(f'Refreshed similar artwork for {count} artwork(s)')
+
+    def print_stats(self):
+        depth = dict(DerivativeJob.objects.values_list('status').annotate(n=Count('id')))
+        self.stdout.write('Queue: ' + ', '.join(
+            f'{label} {depth.get(code, 0)}' for code, label in DerivativeJob.STATUS_CHOICES
+        ))
+        timings = DerivativeJob.objects.filter(status='DONE').aggregate(
+            avg=Avg('duration_ms'), max=Max('duration_ms')
+        )
+        if timings['avg'] is not None:
+            self.stdout.write(f"Job time: avg {timings['avg']:.0f} ms, max {timings['max']} ms")
@@ -0,0 +1,15 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from artwork import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the database (after bulk imports or raw SQL edits)'
+
+    def handle(self, *args, **options):
+        for label in search.SEARCH_FIELDS:
+            model = apps.get_model(label)
+            with transaction.atomic():
+                search.reindex(model)
+            self.stdout.write(self.style.SUCCESS(f'Reindexed {model.objects.count()} {model._meta.verbose_name_plural}'))
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from artwork.cache import bump_catalog_version
+from artwork.derivatives import init_worker, render_artwork_fields
+from artwork.models import Artwork
+from artwork.similarity import refresh as refresh_similarity
+
+class Command(BaseCommand):
+    help = 'Rebuild artwork derivatives in parallel, resuming an interrupted run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', help='Comma-separated artwork ids')
+        parser.add_argument('--since', help='Only artworks updated on or after this date/datetime')
+        parser.add_argument('--missing-only', action='store_true',
+                            help='Only artworks that are missing a derivative')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Rows written per transaction (and per checkpoint)')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, '.regenerate_derivatives.json'),
+                            help='Progress file used to resume an interrupted run')
+        parser.add_argument('--restart', action='store_true', help='Ignore any saved progress')
+
+    def handle(self, *args, **options):
+        queryset = self.filter_queryset(Artwork.objects.exclude(image=''), options)
+        ids = list(queryset.order_by('id').values_list('id', flat=True))
+
+        run_key = self.run_key(options)
+        done = set() if options['restart'] else self.load_checkpoint(options['checkpoint'], run_key)
+        todo = [pk for pk in ids if pk not in done]
+        if done:
+            self.stdout.write(f'Resuming: {len(ids) - len(todo)} of {len(ids)} already done')
+        if not todo:
+            self.stdout.write('Nothing to do')
+            return
+
+        failures = []
+        pending = []
+        self.replaced = 0
+        started = time.monotonic()
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+            futures = [pool.submit(render_artwork_fields, pk) for pk in todo]
+            for future in as_completed(futures):
+                artwork_id, image, fields, duration_ms, error = future.result()
+                if error:
+                    failures.append((artwork_id, error))
+                    self.stdout.write(self.style.ERROR(f'Artwork {artwork_id} failed:\n{error}'))
+                    continue
+                pending.append((artwork_id, image, fields))
+                if len(pending) >= options['batch_size']:
+                    self.flush(pending, done, options['checkpoint'], run_key)
+
+        self.flush(pending, done, options['checkpoint'], run_key)
+        # New embeddings change neighbour lists; update() skipped the usual hook
+        failed = {pk for pk, _ in failures}
+        refresh_similarity(pk for pk in todo if pk not in failed)
+        bump_catalog_version()
+        elapsed = time.monotonic() - started
+        rendered = len(todo) - len(failures)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {rendered} artwork(s) in {elapsed:.1f}s ({rendered / elapsed:.2f} images/s)'
+        ))
+        if self.replaced:
+            # Their saves cleared the fields and queued jobs for process_derivatives
+            self.stdout.write(f'Skipped {self.replaced} artwork(s) whose image was replaced while rendering')
+        if failures:
+            self.stdout.write(self.style.ERROR(
+                f'{len(failures)} failure(s): ' + ', '.join(str(pk) for pk, _ in failures)
+            ))
+        else:
+            # A complete run leaves nothing to resume
+            if os.path.exists(options['checkpoint']):
+                os.remove(options['checkpoint'])
+
+    def filter_queryset(self, queryset, options):
+        if options['ids']:
+            try:
+                queryset = queryset.filter(id__in=[int(pk) for pk in options['ids'].split(',')])
+            except ValueError:
+                raise CommandError('--ids must be a comma-separated list of integers')
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                date = parse_date(options['since'])
+                if date is None:
+                    raise CommandError('--since must be an ISO date or datetime')
+                since = datetime.combine(date, datetime.min.time())
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            queryset = queryset.filter(updated_at__gte=since)
+        if options['missing_only']:
+            queryset = queryset.filter(
+                Q(tile_image='') | Q(tile_image__isnull=True)
+                | Q(thumbnail_image='') | Q(thumbnail_image__isnull=True)
+                | Q(renditions={}) | Q(embedding__isnull=True)
+            )
+        return queryset
+
+    def flush(self, pending, done, checkpoint, run_key):
+        if not pending:
+            return
+        # Conditional on the image rendered, as in Artwork.generate_derivatives: a
+        # replacement saved meanwhile must not get the old file's derivatives
+        with transaction.atomic():
+            for artwork_id, image, fields in pending:
+                if not Artwork.objects.filter(pk=artwork_id, image=image).update(**fields):
+                    self.replaced += 1
+        # update() skips post_save: cached pages and ETags would keep the old
+        # derivative URLs, which gc_derivatives may delete
+        bump_catalog_version()
+        done.update(artwork_id for artwork_id, _, _ in pending)
+        pending.clear()
+        with open(checkpoint, 'w') as f:
+            json.dump({'run': run_key, 'done': sorted(done)}, f)
+
+    def run_key(self, options):
+        # A checkpoint only applies to a rerun with the same selection and settings
+        spec = [options['ids'], options['since'], options['missing_only'],
+                settings.ARTWORK_DERIVATIVE_WIDTHS, settings.ARTWORK_TILE_WIDTH,
+                settings.ARTWORK_THUMBNAIL_SIZE, settings.ARTWORK_DERIVATIVE_QUALITY]
+        return hashlib.sha256(json.dumps(spec, default=str).encode()).hexdigest()
+
+    def load_checkpoint(self, path, run_key):
+        try:
+            with open(path) as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return set()
+        if checkpoint.get('run') != run_key:
+            return set()
+        return set(checkpoint['done'])
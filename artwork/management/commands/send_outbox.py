@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Min
+from django.utils import timezone
+from artwork.models import OutboundEmail
+from artwork.outbox import open_connection, send_batch
+
+
+class Command(BaseCommand):
+    help = 'Send queued transactional emails in batches over a single SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Emails claimed and sent per connection')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Requeue emails that have been sending for this many seconds')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when no emails are due instead of polling')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print queue depth and delivery metrics, then exit')
+        parser.add_argument('--host', help='SMTP host, overriding EMAIL_HOST (e.g. a local stand-in)')
+        parser.add_argument('--port', type=int, help='SMTP port, overriding EMAIL_PORT')
+        parser.add_argument('--no-tls', action='store_true', help='Disable STARTTLS, e.g. for a local stand-in')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+
+        requeued = OutboundEmail.requeue_stale(timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale email(s)'))
+
+        overrides = {'host': options['host'], 'port': options['port']}
+        if options['no_tls']:
+            overrides.update(use_tls=False, use_ssl=False, username='', password='')
+        while True:
+            emails = OutboundEmail.claim(options['batch_size'])
+            if not emails:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+            started = time.monotonic()
+            sent, failed = send_batch(emails, open_connection(**overrides))
+            elapsed_ms = int((time.monotonic() - started) * 1000)
+            style = self.style.ERROR if failed else self.style.SUCCESS
+            self.stdout.write(style(f'Sent {sent}, failed {failed} in {elapsed_ms} ms'))
+
+        self.print_stats()
+
+    def print_stats(self):
+        depth = dict(OutboundEmail.objects.values_list('status').annotate(n=Count('id')))
+        self.stdout.write('Outbox: ' + ', '.join(
+            f'{label} {depth.get(code, 0)}' for code, label in OutboundEmail.STATUS_CHOICES
+        ))
+        pending = OutboundEmail.objects.filter(status='PENDING').aggregate(oldest=Min('created_at'))
+        if pending['oldest'] is not None:
+            age = (timezone.now() - pending['oldest']).total_seconds()
+            self.stdout.write(f'Oldest pending: {age:.0f}s')
+        sent = OutboundEmail.objects.filter(status='SENT', sent_at__gte=timezone.now() - timedelta(hours=1))
+        delivery = sent.aggregate(n=Count('id'), attempts=Avg('attempts'))
+        if delivery['n']:
+            self.stdout.write(f"Sent in the last hour: {delivery['n']} (avg {delivery['attempts']:.1f} attempt(s))")
@@ -1,126 +1,138 @@
 import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from django.core.management.base import BaseCommand
-from PIL import Image
-import numpy as np
-from artwork.models import Artwork
+from django.db import connection, connections
+from artwork.cache import bump_catalog_version
+from artwork.derivatives import init_worker
+from artwork.features import analyze_path
+from artwork.models import Artwork, ArtworkFeatures
+from artwork.similarity import rebuild as rebuild_similarity
 
 class Command(BaseCommand):
     help = 'Analyzes and tags artwork images'
 
-    def analyze_image(self, image_path):
-        """Analyze image to determine if it's a portrait or figure drawing"""
-        try:
-            with Image.open(image_path) as img:
-                # Convert to grayscale for analysis
-                img_gray = img.convert('L')
-                img_array = np.array(img_gray)
-                
-                # Get image dimensions
-                height, width = img_array.shape
-                aspect_ratio = width / height
-                
-                # Analyze brightness distribution
-                # Split image into top, middle, and bottom thirds
-                top_third = img_array[:height//3, :]
-                middle_third = img_array[height//3:2*height//3, :]
-                bottom_third = img_array[2*height//3:, :]
-                
-                # Calculate average brightness for each section
-                top_brightness = np.mean(top_third)
-                middle_brightness = np.mean(middle_third)
-                bottom_brightness = np.mean(bottom_third)
-                
-                # Calculate brightness variation
-                brightness_variation = np.std(img_array)
-                
-                # Determine if it's a portrait or figure
-                # Portraits typically have more detail in the top region
-                # and are more vertical
-                is_portrait = (
-                    aspect_ratio < 1.2 and  # More vertical
-                    top_brightness < middle_brightness and  # More detail in top
-                    brightness_variation > 50  # More contrast
-                )
-                
-                return 'PORTRAIT' if is_portrait else 'FIGURE'
-        except Exception as e:
-            self.stdout.write(self.style.WARNING(f"Error analyzing image {image_path}: {str(e)}"))
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes used to analyze images')
+        parser.add_argument('--refresh', action='store_true',
+                            help='Re-analyze every image instead of reusing stored features')
+        parser.add_argument('--portrait-max-aspect', type=float, default=1.2)
+        parser.add_argument('--portrait-min-contrast', type=float, default=50)
+        parser.add_argument('--oil-min-contrast', type=float, default=60)
+        parser.add_argument('--oil-max-brightness', type=float, default=200)
+
+    def analyze_image(self, features, options):
+        """Determine if it's a portrait or figure drawing"""
+        if features is None:
             return 'FIGURE'  # Default to figure if analysis fails
 
-    def determine_medium(self, filename, image_path):
+        # Portraits typically have more detail in the top region
+        # and are more vertical
+        is_portrait = (
+            features.aspect_ratio < options['portrait_max_aspect'] and  # More vertical
+            features.top_brightness < features.middle_brightness and  # More detail in top
+            features.contrast > options['portrait_min_contrast']  # More contrast
+        )
+        return 'PORTRAIT' if is_portrait else 'FIGURE'
+
+    def determine_medium(self, filename, features, options):
         """Determine if the artwork is an oil painting or drawing"""
         filename_lower = filename.lower()
-        
+
         # Check filename patterns
         if any(keyword in filename_lower for keyword in ['oil', 'painting', 'canvas']):
             return 'OIL'
         if any(keyword in filename_lower for keyword in ['drawing', 'sketch', 'pencil', 'graphite']):
             return 'GRAPHITE'
-            
-        # If filename doesn't give clear indication, analyze the image
-        try:
-            with Image.open(image_path) as img:
-                # Convert to grayscale
-                img_gray = img.convert('L')
-                img_array = np.array(img_gray)
-                
-                # Calculate image statistics
-                brightness = np.mean(img_array)
-                contrast = np.std(img_array)
-                
-                # Oil paintings typically have:
-                # - Higher contrast
-                # - More varied brightness
-                # - More texture
-                if contrast > 60 and brightness < 200:
-                    return 'OIL'
-                else:
-                    return 'GRAPHITE'
-        except Exception as e:
-            self.stdout.write(self.style.WARNING(f"Error analyzing medium for {filename}: {str(e)}"))
+
+        if features is None:
             return 'GRAPHITE'  # Default to graphite if analysis fails
 
+        # Oil paintings typically have:
+        # - Higher contrast
+        # - More varied brightness
+        # - More texture
+        if features.contrast > options['oil_min_contrast'] and features.brightness < options['oil_max_brightness']:
+            return 'OIL'
+        return 'GRAPHITE'
+
     def handle(self, *args, **options):
-        artworks = Artwork.objects.all()
-        
+        artworks = [artwork for artwork in Artwork.objects.exclude(image='').select_related('features')]
+        features = self.collect_features(artworks, options['workers'], options['refresh'])
+
+        tagged = []
         for artwork in artworks:
-            if not artwork.image:
+            if artwork.pk not in features:
                 continue
-                
-            image_path = artwork.image.path
-            if not os.path.exists(image_path):
-                self.stdout.write(self.style.WARNING(f"Image file not found: {image_path}"))
-                continue
-            
-            # Analyze image to determine category
-            category = self.analyze_image(image_path)
-            
-            # Determine medium
-            medium = self.determine_medium(artwork.image.name, image_path)
-            
+            stats = features[artwork.pk]  # None if the analysis failed
+
             # Assign status with weighted probabilities
             status = random.choices(
                 ['FOR_SALE', 'SOLD', 'NOT_AVAILABLE'],
                 weights=[60, 20, 20]
             )[0]
-            
-            # Set price if for sale
-            if status == 'FOR_SALE':
-                price = random.randint(50, 1000)
-            else:
-                price = None
-            
+
             # Update artwork
-            artwork.category = category
-            artwork.medium = medium
+            artwork.category = self.analyze_image(stats, options)
+            artwork.medium = self.determine_medium(artwork.image.name, stats, options)
             artwork.status = status
-            if price:
-                artwork.price = price
-            artwork.save()
-            
+            # Set price if for sale
+            if status == 'FOR_SALE':
+                artwork.price = random.randint(50, 1000)
+            tagged.append(artwork)
+
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"{artwork.image.name}: {medium} {category} ({status})"
+                    f"{artwork.image.name}: {artwork.medium} {artwork.category} ({status})"
                 )
-            ) 
\ No newline at end of file
+            )
+
+        Artwork.objects.bulk_update(tagged, ['category', 'medium', 'status', 'price'], batch_size=500)
+        # bulk_update sends no signals
+        bump_catalog_version()
+        # Statuses were reassigned, so which artworks may be shown as similar changed
+        rebuild_similarity()
+
+    def collect_features(self, artworks, workers, refresh):
+        """Stored features where they match the current image, fresh analysis otherwise."""
+        features = {}
+        jobs = []
+        for artwork in artworks:
+            stored = getattr(artwork, 'features', None)
+            if not refresh and stored and artwork.image_hash and stored.image_hash == artwork.image_hash:
+                features[artwork.pk] = stored
+                continue
+            image_path = artwork.image.path
+            if not os.path.exists(image_path):
+                self.stdout.write(self.style.WARNING(f"Image file not found: {image_path}"))
+                continue
+            jobs.append((artwork.pk, image_path))
+
+        if not jobs:
+            return features
+
+        by_id = {artwork.pk: artwork for artwork in artworks}
+        analyzed = []
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            for artwork_id, stats, error in pool.map(analyze_path, jobs, chunksize=8):
+                if error:
+                    self.stdout.write(self.style.WARNING(f"Error analyzing image {by_id[artwork_id].image.name}: {error}"))
+                    features[artwork_id] = None
+                    continue
+                row = ArtworkFeatures(artwork_id=artwork_id, image_hash=by_id[artwork_id].image_hash, **stats)
+                features[artwork_id] = row
+                analyzed.append(row)
+
+        update_fields = ['image_hash', 'computed_at'] + ArtworkFeatures.STAT_FIELDS
+        ArtworkFeatures.objects.bulk_create(
+            analyzed,
+            batch_size=500,
+            update_conflicts=True,
+            update_fields=update_fields,
+            # MySQL upserts on any unique key and rejects an explicit target
+            unique_fields=['artwork'] if connection.features.supports_update_conflicts_with_target else None,
+        )
+        return features
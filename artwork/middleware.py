@@ -0,0 +1,188 @@
+"""Response compression: brotli or gzip, whichever the client prefers.
+
+Used instead of ``GZipMiddleware``. It adds brotli (when the ``brotli``
+package is installed), leaves alone content types that don't compress and
+bodies too small to gain, and compresses streaming responses chunk by chunk.
+Responses served from the page cache (``artwork.page_cache``) carry a key for
+their compressed bodies, which are kept in the cache beside the page, so a
+hot page is compressed once per encoding, at a higher level, rather than on
+every hit.
+"""
+import gzip
+import secrets
+import zlib
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Random-length gzip filename padding, as GZipMiddleware adds against BREACH
+MAX_RANDOM_BYTES = 100
+
+
+def gzip_compress(data, level):
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    header = bytearray(compressed[:10])
+    header[3] = gzip.FNAME
+    return bytes(header) + b'a' * secrets.randbelow(MAX_RANDOM_BYTES) + b'\x00' + compressed[10:]
+
+
+def brotli_compress(data, level):
+    return brotli.compress(data, quality=level)
+
+
+# Input compressed between flushes of a stream. Flushing every chunk costs
+# ratio badly on small chunks, e.g. one per JSON row; the compressible types
+# don't include event streams, which need each chunk sent at once.
+STREAM_FLUSH_BYTES = 16 * 1024
+
+
+class _Stream:
+    def __init__(self):
+        self.pending = 0
+
+    def chunk(self, data):
+        output = self.process(data)
+        self.pending += len(data)
+        if self.pending >= STREAM_FLUSH_BYTES:
+            self.pending = 0
+            output += self.flush()
+        return output
+
+
+class _GzipStream(_Stream):
+    def __init__(self, level):
+        super().__init__()
+        # wbits 31: a gzip member rather than a bare deflate stream
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream(_Stream):
+    def __init__(self, level):
+        super().__init__()
+        self.compressor = brotli.Compressor(quality=level)
+
+    def process(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+ENCODERS = {
+    'gzip': (gzip_compress, _GzipStream),
+}
+if brotli is not None:
+    ENCODERS['br'] = (brotli_compress, _BrotliStream)
+
+
+def negotiate(accept_encoding):
+    """The supported encoding ``Accept-Encoding`` ranks highest, brotli on ties, or ``None``."""
+    best, best_q = None, 0.0
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        candidates = ENCODERS if coding == '*' else [coding] if coding in ENCODERS else []
+        for candidate in candidates:
+            if q > best_q or (q == best_q and q > 0 and candidate == 'br'):
+                best, best_q = candidate, q
+    return best
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not self.compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(response, encoding)
+            # The compressed size isn't known until the stream ends
+            del response.headers['Content-Length']
+        else:
+            content = self.compress_body(response, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        # The representation changed: a strong ETag must become weak (RFC 9110 8.8.1),
+        # which If-None-Match still matches
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def compressible(self, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in settings.ARTWORK_COMPRESS_TYPES:
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        if response.streaming:
+            length = response.get('Content-Length')
+            return length is None or int(length) >= settings.ARTWORK_COMPRESS_MIN_BYTES
+        return len(response.content) >= settings.ARTWORK_COMPRESS_MIN_BYTES
+
+    def compress_body(self, response, encoding):
+        compress = ENCODERS[encoding][0]
+        key = getattr(response, 'compressed_cache_key', None)
+        if key is None:
+            return compress(response.content, settings.ARTWORK_COMPRESS_LEVELS[encoding])
+        key = f'{key}:{encoding}'
+        content = cache.get(key)
+        if content is None:
+            content = compress(response.content, settings.ARTWORK_COMPRESS_CACHED_LEVELS[encoding])
+            cache.set(key, content, settings.ARTWORK_PAGE_CACHE_TIMEOUT)
+        return content
+
+    def compress_stream(self, response, encoding):
+        stream = ENCODERS[encoding][1](settings.ARTWORK_COMPRESS_LEVELS[encoding])
+        # Keep a reference: streaming_content is about to be replaced
+        chunks = response.streaming_content
+
+        if response.is_async:
+            async def compressed():
+                async for chunk in chunks:
+                    data = stream.chunk(chunk)
+                    if data:
+                        yield data
+                yield stream.finish()
+            return compressed()
+
+        def compressed():
+            for chunk in chunks:
+                data = stream.chunk(chunk)
+                if data:
+                    yield data
+            yield stream.finish()
+        return compressed()
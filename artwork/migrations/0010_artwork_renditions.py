@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artwork', '0009_derivativejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artwork',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 01:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artwork', '0010_artwork_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artwork',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
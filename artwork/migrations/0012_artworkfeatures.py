@@ -0,0 +1,32 @@
+# Generated by Django 5.0.14 on 2026-10-18 01:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artwork', '0011_artwork_image_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArtworkFeatures',
+            fields=[
+                ('artwork', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='features', serialize=False, to='artwork.artwork')),
+                ('image_hash', models.CharField(blank=True, help_text='Artwork.image_hash the statistics were computed from', max_length=64)),
+                ('aspect_ratio', models.FloatField()),
+                ('top_brightness', models.FloatField()),
+                ('middle_brightness', models.FloatField()),
+                ('bottom_brightness', models.FloatField()),
+                ('brightness', models.FloatField()),
+                ('contrast', models.FloatField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Artwork Features',
+                'verbose_name_plural': 'Artwork Features',
+            },
+        ),
+    ]
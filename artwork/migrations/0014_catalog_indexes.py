@@ -0,0 +1,45 @@
+# Generated by Django 5.0.14 on 2026-10-18 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artwork', '0013_artwork_dimensions_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='artwork',
+            index=models.Index(fields=['created_at', 'id'], name='artwork_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artwork',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='artwork_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artwork',
+            index=models.Index(fields=['status', 'price', 'created_at'], name='artwork_status_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artwork',
+            index=models.Index(fields=['medium', 'category', 'created_at', 'id'], name='artwork_medium_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artwork',
+            index=models.Index(fields=['price', 'created_at', 'id'], name='artwork_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artwork',
+            index=models.Index(fields=['price', '-created_at', '-id'], name='artwork_price_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commissionrequest',
+            index=models.Index(fields=['created_at'], name='commission_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commissionrequest',
+            index=models.Index(fields=['status', 'created_at'], name='commission_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# table -> searchable columns, as in artwork.search.SEARCH_FIELDS
+SEARCH_TABLES = {
+    'artwork_artwork': ('title', 'description'),
+    'artwork_commissionrequest': ('name', 'description'),
+}
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    for table, fields in SEARCH_TABLES.items():
+        columns = ', '.join(quote(f) for f in fields)
+        coalesced = ', '.join(f"COALESCE({quote(f)}, '')" for f in fields)
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'")
+                if cursor.fetchone() is None:
+                    # Search falls back to icontains without FTS5
+                    return
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {quote(table + '_fts')} USING fts5({columns}, "
+                f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+            schema_editor.execute(
+                f"INSERT INTO {quote(table + '_fts')} (rowid, {columns}) "
+                f"SELECT id, {coalesced} FROM {quote(table)}"
+            )
+        elif connection.vendor == 'mysql':
+            schema_editor.execute(
+                f"ALTER TABLE {quote(table)} ADD FULLTEXT INDEX {quote(table + '_fulltext')} ({columns})"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    for table in SEARCH_TABLES:
+        if connection.vendor == 'sqlite':
+            schema_editor.execute(f"DROP TABLE IF EXISTS {quote(table + '_fts')}")
+        elif connection.vendor == 'mysql':
+            schema_editor.execute(f"ALTER TABLE {quote(table)} DROP INDEX {quote(table + '_fulltext')}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artwork', '0014_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
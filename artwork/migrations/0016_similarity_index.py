@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-18 01:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artwork', '0015_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artwork',
+            name='embedding',
+            field=models.BinaryField(blank=True, help_text='Visual fingerprint used to find similar artwork', null=True),
+        ),
+        migrations.CreateModel(
+            name='SimilarArtwork',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Cosine similarity of the two embeddings')),
+                ('artwork', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_links', to='artwork.artwork')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_of', to='artwork.artwork')),
+            ],
+            options={
+                'ordering': ['artwork', '-score'],
+                'indexes': [models.Index(fields=['artwork', '-score'], name='similar_artwork_score_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='similarartwork',
+            constraint=models.UniqueConstraint(fields=('artwork', 'similar'), name='unique_similar_artwork'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-18 01:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def queue_existing_images(apps, schema_editor):
+    ModelImage = apps.get_model('artwork', 'ModelImage')
+    DerivativeJob = apps.get_model('artwork', 'DerivativeJob')
+    DerivativeJob.objects.bulk_create([DerivativeJob(model_image_id=pk) for pk in ModelImage.objects.values_list('pk', flat=True)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artwork', '0017_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='derivativejob',
+            name='model_image',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='derivative_jobs', to='artwork.modelimage'),
+        ),
+        migrations.AddField(
+            model_name='modelimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, help_text='Upright review copy rendered in the background', null=True, upload_to='model_applications/thumbnails/'),
+        ),
+        migrations.AlterField(
+            model_name='derivativejob',
+            name='artwork',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='derivative_jobs', to='artwork.artwork'),
+        ),
+        migrations.AddConstraint(
+            model_name='derivativejob',
+            constraint=models.CheckConstraint(check=models.Q(('artwork__isnull', True), ('model_image__isnull', True), _connector='XOR'), name='derivative_job_one_subject'),
+        ),
+        # Review thumbnails for photos uploaded before they existed
+        migrations.RunPython(queue_existing_images, migrations.RunPython.noop),
+    ]
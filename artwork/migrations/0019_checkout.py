@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-18 01:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artwork', '0018_model_image_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Checkout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(max_length=128, unique=True)),
+                ('outcome', models.CharField(choices=[('SOLD', 'Sold'), ('UNAVAILABLE', 'Artwork unavailable')], max_length=20)),
+                ('customer_name', models.CharField(max_length=200)),
+                ('customer_email', models.EmailField(max_length=254)),
+                ('customer_phone', models.CharField(blank=True, max_length=50)),
+                ('customer_address', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('artwork', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='checkouts', to='artwork.artwork')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artwork', '0019_checkout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artwork',
+            name='similarity_stale',
+            field=models.BooleanField(db_index=True, default=False, editable=False, help_text='Similar-artwork lists need refreshing for this artwork'),
+        ),
+    ]
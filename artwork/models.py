@@ -1,10 +1,27 @@
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
 from django.core.validators import MinValueValidator
 from django.utils import timezone
-from PIL import Image
-from io import BytesIO
+from django.conf import settings
 from django.core.files.base import ContentFile
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.html import strip_tags
 import os
+from datetime import timedelta
+from functools import lru_cache
+from .cache import bump_catalog_version, site_cached
+from .imaging import (
+    FORMATS, available_formats, derivative_key, image_size, plan_renditions, render_derivatives,
+    render_review_thumbnail, source_digest, summarize_file,
+)
+
+@lru_cache(maxsize=16384)
+def media_url(storage, name):
+    """``storage.url(name)``, memoised. A storage URL depends only on the name, and
+    ``urljoin`` dominates rendering srcsets for list pages."""
+    return storage.url(name)
+
 
 class SiteSettings(models.Model):
     show_models_page = models.BooleanField(default=True, help_text="Show the Models page in the navigation bar")
@@ -16,6 +33,10 @@ class SiteSettings(models.Model):
 
     @classmethod
     def get_settings(cls):
+        return site_cached('site_settings', cls.load)
+
+    @classmethod
+    def load(cls):
         settings, created = cls.objects.get_or_create(pk=1)
         return settings
 
@@ -45,6 +66,14 @@ class Artwork(models.Model):
         ('FIGURE', 'Figure'),
     ]
 
+    # Catalog sort orders; each ends in a unique column so keyset pages are stable
+    SORT_ORDERINGS = {
+        'newest': ('-created_at', '-id'),
+        'oldest': ('created_at', 'id'),
+        'price_high': ('-price', '-created_at', '-id'),
+        'price_low': ('price', '-created_at', '-id'),
+    }
+
     title = models.CharField(max_length=200)
     description = models.TextField()
     image = models.ImageField(upload_to='artwork/')
@@ -60,60 +89,596 @@ class Artwork(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_featured = models.BooleanField(default=False)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    placeholder = models.TextField(blank=True, editable=False, help_text="Tiny blurred preview as a data URI")
+    dominant_color = models.CharField(max_length=7, blank=True, editable=False)
+    embedding = models.BinaryField(null=True, blank=True, editable=False,
+                                   help_text="Visual fingerprint used to find similar artwork")
+    similarity_stale = models.BooleanField(default=False, db_index=True, editable=False,
+                                           help_text="Similar-artwork lists need refreshing for this artwork")
+
+    class Meta:
+        # One index per catalog filter/sort path; artwork.tests checks they are used
+        indexes = [
+            # Latest artwork, newest/oldest sorts and their keyset pages
+            models.Index(fields=['created_at', 'id'], name='artwork_created_idx'),
+            # Status filter sorted by date (gallery, API)
+            models.Index(fields=['status', 'created_at', 'id'], name='artwork_status_created_idx'),
+            # Featured (for sale by price)
+            models.Index(fields=['status', 'price', 'created_at'], name='artwork_status_price_idx'),
+            # Similar artwork and medium/category filters sorted by date
+            models.Index(fields=['medium', 'category', 'created_at', 'id'], name='artwork_medium_category_idx'),
+            # price_high, and price_low with its newest-first tie-break
+            models.Index(fields=['price', 'created_at', 'id'], name='artwork_price_idx'),
+            models.Index(fields=['price', '-created_at', '-id'], name='artwork_price_newest_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a save can tell whether the status or the image changed
+        instance._loaded_status = instance.__dict__.get('status')
+        if 'image' in instance.__dict__:
+            # The raw column value; reading the descriptor would load a deferred field
+            image = instance.__dict__['image']
+            instance._loaded_image = getattr(image, 'name', image)
+        return instance
+
     def save(self, *args, **kwargs):
-        if self.image and (not self.tile_image or not self.thumbnail_image):
-            # Generate tile image (400px width)
-            self.generate_tile_image()
-            # Generate thumbnail image (150x150px)
-            self.generate_thumbnail_image()
+        update_fields = kwargs.get('update_fields')
+        if self.image_changed() and (update_fields is None or 'image' in update_fields):
+            # Everything derived from the old file is keyed by its content; start over
+            self.clear_derivatives()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.DERIVATIVE_FIELDS}
         super().save(*args, **kwargs)
+        if 'image' in self.__dict__:
+            self._loaded_image = self.image.name
+        # Tiles and thumbnails are rendered by the process_derivatives worker
+        if self.needs_derivatives():
+            DerivativeJob.enqueue(self)
 
-    def generate_tile_image(self):
-        if not self.image:
-            return
+    def image_changed(self):
+        # Only instances loaded with their image can tell; a deferred image wasn't assigned
+        return (hasattr(self, '_loaded_image') and 'image' in self.__dict__
+                and self._loaded_image != self.image.name)
 
-        img = Image.open(self.image)
-        
-        # Calculate new height maintaining aspect ratio
-        width = 400
-        ratio = width / float(img.size[0])
-        height = int(float(img.size[1]) * ratio)
-        
-        # Resize image
-        img = img.resize((width, height), Image.Resampling.LANCZOS)
-        
-        # Save to BytesIO
-        buffer = BytesIO()
-        img.save(buffer, format='JPEG', quality=85)
-        
-        # Generate filename
-        filename = os.path.basename(self.image.name)
-        name, ext = os.path.splitext(filename)
-        new_filename = f"{name}_tile{ext}"
-        
-        # Save to model
-        self.tile_image.save(new_filename, ContentFile(buffer.getvalue()), save=False)
-
-    def generate_thumbnail_image(self):
-        if not self.image:
-            return
+    def clear_derivatives(self):
+        self.image_hash = ''
+        self.image_width = self.image_height = None
+        self.placeholder = self.dominant_color = ''
+        self.renditions = {}
+        self.tile_image = self.thumbnail_image = None
+        self.embedding = None
+
+    def needs_derivatives(self):
+        return bool(self.image) and (
+            not self.image_hash or not self.tile_image or not self.thumbnail_image
+            or not self.renditions or self.embedding is None
+        )
+
+    @property
+    def tile_url(self):
+        # Fall back to the original until the derivative job has finished
+        return self.tile_image.url if self.tile_image else self.image.url
+
+    @property
+    def tile_size(self):
+        """``(width, height)`` of the image behind ``tile_url``, if known."""
+        for rendition in self.renditions.get('jpeg', []):
+            if rendition['name'] == self.tile_image.name:
+                return rendition['width'], rendition['height']
+        return self.image_width, self.image_height
+
+    @property
+    def tile_width(self):
+        return self.tile_size[0]
+
+    @property
+    def tile_height(self):
+        return self.tile_size[1]
+
+    def resized_url(self, width, ext='jpg'):
+        """URL of an on-demand resize; ``width`` must be in ARTWORK_RESIZE_WIDTHS."""
+        return reverse('resized_artwork', args=[width, self.pk, ext])
+
+    @property
+    def thumbnail_url(self):
+        return self.thumbnail_image.url if self.thumbnail_image else self.image.url
+
+    def srcset_for(self, fmt):
+        storage = self.image.storage
+        return ', '.join(
+            f"{media_url(storage, r['name'])} {r['width']}w" for r in self.renditions.get(fmt, [])
+        )
+
+    @property
+    def srcset(self):
+        return self.srcset_for('jpeg')
+
+    @property
+    def sources(self):
+        """``<source>`` candidates for the modern formats, smallest first.
+
+        JPEG is left out because it is always the ``<img>`` fallback, and so
+        is any format that came out no smaller than the JPEGs.
+        """
+        totals = {fmt: sum(r.get('size', 0) for r in entries) for fmt, entries in self.renditions.items()}
+        sources = []
+        for fmt, total in totals.items():
+            if fmt == 'jpeg' or fmt not in FORMATS or total >= totals.get('jpeg', 0):
+                continue
+            sources.append((total, {'type': FORMATS[fmt][1], 'srcset': self.srcset_for(fmt)}))
+        return [source for _, source in sorted(sources, key=lambda s: s[0])]
+
+    def derivative_name(self, fmt, **params):
+        key = derivative_key(self.image_hash, fmt, **params)
+        return f'{settings.ARTWORK_DERIVATIVE_ROOT}/{key[:2]}/{key}.{FORMATS[fmt][2]}'
+
+    # Fields written by render_derivative_files()
+    DERIVATIVE_FIELDS = [
+        'image_hash', 'image_width', 'image_height', 'placeholder', 'dominant_color',
+        'renditions', 'tile_image', 'thumbnail_image', 'embedding',
+    ]
+
+    def generate_derivatives(self, force=False):
+        """Render any missing derivatives and store them. Safe to call repeatedly."""
+        if not force and not self.needs_derivatives():
+            return False
+        self.render_derivative_files()
+        # The lists are refreshed in a batch by the worker (artwork.similarity.refresh_stale)
+        self.similarity_stale = True
+        # One conditional UPDATE rather than a read and a write in a transaction, which
+        # SQLite fails with "database is locked" when two workers upgrade at once
+        fields = [*self.DERIVATIVE_FIELDS, 'similarity_stale']
+        updated = type(self).objects.filter(pk=self.pk, image=self.image.name).update(
+            **{field: getattr(self, field) for field in fields}
+        )
+        if not updated:
+            # The image was replaced while this one rendered; its save cleared
+            # the fields, and finishing the job queues it again
+            return False
+        # update() skips the post_save signal that invalidates cached pages
+        bump_catalog_version()
+        return True
+
+    def render_derivative_files(self):
+        """Write derivative files and set the derivative fields, without saving the row.
+
+        Files are named after the source content and transform, so anything
+        already on disk (from this artwork or an identical upload) is reused
+        without decoding the original.
+        """
+        storage = self.image.storage
+        widths = set(settings.ARTWORK_DERIVATIVE_WIDTHS) | {settings.ARTWORK_TILE_WIDTH}
+        thumbnail_size = settings.ARTWORK_THUMBNAIL_SIZE
+        quality = settings.ARTWORK_DERIVATIVE_QUALITY
+        formats = available_formats(quality)
+
+        self.image.open('rb')
+        try:
+            self.image_hash = source_digest(self.image)
+            self.image_width, self.image_height = image_size(self.image)
+            planned = {
+                (width, height, fmt): self.derivative_name(fmt, width=width, quality=quality[fmt])
+                for width, height in plan_renditions((self.image_width, self.image_height), widths)
+                for fmt in formats
+            }
+            thumbnail_name = self.derivative_name(
+                'jpeg', thumbnail='%dx%d' % thumbnail_size, quality=quality['jpeg']
+            )
+            missing = {name for name in [*planned.values(), thumbnail_name] if not storage.exists(name)}
+            result = render_derivatives(self.image, widths, thumbnail_size, quality) if missing else None
+        finally:
+            self.image.close()
+
+        rendered = {}
+        if result:
+            self.placeholder, self.dominant_color = result['placeholder'], result['dominant_color']
+            self.embedding = result['embedding']
+            rendered[thumbnail_name] = result['thumbnail'][2]
+            for width, height, encoded in result['renditions']:
+                for fmt, data in encoded.items():
+                    rendered[planned[width, height, fmt]] = data
+        for name in missing:
+            saved = storage.save(name, ContentFile(rendered[name]))
+            if saved != name:
+                # A concurrent job wrote the same content first
+                storage.delete(saved)
+
+        renditions = {}
+        for (width, height, fmt), name in planned.items():
+            renditions.setdefault(fmt, []).append(
+                {'width': width, 'height': height, 'name': name, 'size': storage.size(name)}
+            )
+        self.renditions = renditions
+
+        if not result:
+            # Nothing was decoded; the smallest rendition is plenty for the placeholder
+            with storage.open(renditions['jpeg'][0]['name']) as smallest:
+                self.placeholder, self.dominant_color, self.embedding = summarize_file(smallest)
+
+        # The tile is the widest JPEG rendition that fits the tile width, so it
+        # is stored once and shared with the srcset
+        jpegs = renditions['jpeg']
+        tile = [r for r in jpegs if r['width'] <= settings.ARTWORK_TILE_WIDTH] or jpegs[:1]
+        self.tile_image.name = tile[-1]['name']
+        self.thumbnail_image.name = thumbnail_name
+
+class ArtworkFeatures(models.Model):
+    """Image statistics computed by tag_artwork, kept so re-tagging needs no image I/O."""
+    STAT_FIELDS = ['aspect_ratio', 'top_brightness', 'middle_brightness', 'bottom_brightness', 'brightness', 'contrast']
+
+    artwork = models.OneToOneField(Artwork, related_name='features', on_delete=models.CASCADE, primary_key=True)
+    image_hash = models.CharField(max_length=64, blank=True, help_text="Artwork.image_hash the statistics were computed from")
+    aspect_ratio = models.FloatField()
+    top_brightness = models.FloatField()
+    middle_brightness = models.FloatField()
+    bottom_brightness = models.FloatField()
+    brightness = models.FloatField()
+    contrast = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Artwork Features'
+        verbose_name_plural = 'Artwork Features'
+
+    def __str__(self):
+        return f"Features for {self.artwork}"
+
+class SimilarArtwork(models.Model):
+    """One entry of an artwork's precomputed nearest-neighbour list (see ``artwork.similarity``)."""
+    artwork = models.ForeignKey(Artwork, related_name='similar_links', on_delete=models.CASCADE)
+    similar = models.ForeignKey(Artwork, related_name='similar_of', on_delete=models.CASCADE)
+    score = models.FloatField(help_text="Cosine similarity of the two embeddings")
+
+    class Meta:
+        ordering = ['artwork', '-score']
+        constraints = [
+            models.UniqueConstraint(fields=['artwork', 'similar'], name='unique_similar_artwork'),
+        ]
+        indexes = [
+            models.Index(fields=['artwork', '-score'], name='similar_artwork_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.similar} similar to {self.artwork} ({self.score:.2f})"
+
+class DerivativeJob(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    MAX_ATTEMPTS = 5
+    RETRY_BACKOFF_SECONDS = 30
+
+    # Exactly one of these: an artwork's derivatives or a model application photo's review thumbnail
+    artwork = models.ForeignKey(Artwork, related_name='derivative_jobs', on_delete=models.CASCADE,
+                                null=True, blank=True)
+    model_image = models.ForeignKey('ModelImage', related_name='derivative_jobs', on_delete=models.CASCADE,
+                                    null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        constraints = [
+            # At most one outstanding job per artwork; MySQL ignores it, see enqueue()
+            models.UniqueConstraint(
+                fields=['artwork'],
+                condition=models.Q(status__in=['PENDING', 'RUNNING']),
+                name='unique_open_derivative_job',
+            ),
+            # check= is condition= from Django 5.1 and gone in 6.0, hence the <6 in requirements.txt
+            models.CheckConstraint(
+                check=models.Q(artwork__isnull=True) ^ models.Q(model_image__isnull=True),
+                name='derivative_job_one_subject',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Derivatives for {self.subject} ({self.get_status_display()})"
 
-        img = Image.open(self.image)
-        # Resize to fit within 150x150, maintaining aspect ratio
-        img.thumbnail((150, 150), Image.Resampling.LANCZOS)
+    @property
+    def subject(self):
+        return self.artwork if self.artwork_id else self.model_image
 
-        buffer = BytesIO()
-        img.save(buffer, format='JPEG', quality=85)
+    @classmethod
+    def enqueue(cls, artwork):
+        if connection.features.supports_partial_indexes:
+            return cls._enqueue(artwork)
+        # MySQL doesn't enforce unique_open_derivative_job (models.W036), so the check and
+        # insert are serialised on the artwork's row instead. Not done everywhere: on SQLite
+        # a transaction that reads and then writes fails with "database is locked".
+        with transaction.atomic():
+            list(Artwork.objects.select_for_update().filter(pk=artwork.pk).values_list('pk', flat=True))
+            return cls._enqueue(artwork)
+
+    @classmethod
+    def _enqueue(cls, artwork):
+        open_jobs = cls.objects.filter(artwork=artwork, status__in=['PENDING', 'RUNNING'])
+        if open_jobs.exists():
+            return None
+        try:
+            with transaction.atomic():
+                return cls.objects.create(artwork=artwork)
+        except IntegrityError:
+            # Another request queued the same artwork first
+            return None
+
+    @classmethod
+    def enqueue_model_images(cls, images):
+        """Queue review thumbnails for freshly uploaded ``images`` in one insert."""
+        return cls.objects.bulk_create([cls(model_image=image) for image in images])
+
+    @classmethod
+    def claim(cls, limit):
+        """Mark up to ``limit`` due jobs as running and return them."""
+        now = timezone.now()
+        candidates = cls.objects.filter(status='PENDING', run_after__lte=now).values_list('pk', flat=True)[:limit]
+        claimed = []
+        for pk in candidates:
+            updated = cls.objects.filter(pk=pk, status='PENDING').update(
+                status='RUNNING', started_at=now, attempts=models.F('attempts') + 1
+            )
+            if updated:
+                claimed.append(pk)
+        return list(cls.objects.filter(pk__in=claimed).select_related('artwork', 'model_image__application'))
+
+    @classmethod
+    def requeue_stale(cls, older_than):
+        """Return jobs left running by a worker that died back to the queue."""
+        cutoff = timezone.now() - older_than
+        return cls.objects.filter(status='RUNNING', started_at__lt=cutoff).update(status='PENDING')
+
+    @classmethod
+    def prune(cls, older_than):
+        """Delete jobs that finished successfully more than ``older_than`` ago."""
+        cutoff = timezone.now() - older_than
+        deleted, _ = cls.objects.filter(status='DONE', finished_at__lt=cutoff).delete()
+        return deleted
+
+    def mark_done(self, duration_ms):
+        self.status = 'DONE'
+        self.finished_at = timezone.now()
+        self.duration_ms = duration_ms
+        self.last_error = ''
+        self.save(update_fields=['status', 'finished_at', 'duration_ms', 'last_error'])
+        if self.artwork_id:
+            # An image replaced mid-render couldn't queue a job while this one was open
+            artwork = Artwork.objects.filter(pk=self.artwork_id).first()
+            if artwork is not None and artwork.needs_derivatives():
+                DerivativeJob.enqueue(artwork)
+
+    def mark_failed(self, duration_ms, error):
+        self.finished_at = timezone.now()
+        self.duration_ms = duration_ms
+        self.last_error = error
+        if self.attempts < self.MAX_ATTEMPTS:
+            self.status = 'PENDING'
+            self.run_after = self.finished_at + timedelta(
+                seconds=self.RETRY_BACKOFF_SECONDS * 2 ** (self.attempts - 1)
+            )
+        else:
+            self.status = 'FAILED'
+        self.save(update_fields=['status', 'finished_at', 'duration_ms', 'last_error', 'run_after'])
+
+class OutboundEmail(models.Model):
+    """A transactional email waiting for the ``send_outbox`` worker.
+
+    Queued in the same transaction as the change it reports, so a sale or
+    application is never recorded without its emails, and SMTP never runs
+    inside a request.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    MAX_ATTEMPTS = 8
+    RETRY_BACKOFF_SECONDS = 60
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Outbound Email'
+        indexes = [
+            # The worker's claim query
+            models.Index(fields=['status', 'run_after'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)} ({self.get_status_display()})"
+
+    @classmethod
+    def queue(cls, subject, template, context, to, from_email=None):
+        """Render ``template`` and queue it, as HTML with a plain-text part."""
+        html_body = render_to_string(template, context)
+        return cls.objects.create(
+            subject=subject,
+            body=strip_tags(html_body),
+            html_body=html_body,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=list(to),
+        )
 
-        filename = os.path.basename(self.image.name)
-        name, ext = os.path.splitext(filename)
-        new_filename = f"{name}_thumb{ext}"
+    @classmethod
+    def claim(cls, limit):
+        """Mark up to ``limit`` due emails as sending and return them, oldest first."""
+        now = timezone.now()
+        candidates = cls.objects.filter(status='PENDING', run_after__lte=now).values_list('pk', flat=True)[:limit]
+        claimed = []
+        for pk in candidates:
+            updated = cls.objects.filter(pk=pk, status='PENDING').update(
+                status='SENDING', started_at=now, attempts=models.F('attempts') + 1
+            )
+            if updated:
+                claimed.append(pk)
+        return list(cls.objects.filter(pk__in=claimed))
+
+    @classmethod
+    def requeue_stale(cls, older_than):
+        """Return emails left sending by a worker that died back to the queue."""
+        cutoff = timezone.now() - older_than
+        return cls.objects.filter(status='SENDING', started_at__lt=cutoff).update(status='PENDING')
+
+    def to_message(self):
+        message = EmailMultiAlternatives(self.subject, self.body, self.from_email or None, self.to)
+        if self.html_body:
+            message.attach_alternative(self.html_body, 'text/html')
+        return message
+
+    def mark_sent(self):
+        self.status = 'SENT'
+        self.sent_at = timezone.now()
+        self.last_error = ''
+        self.save(update_fields=['status', 'sent_at', 'last_error'])
+
+    def mark_failed(self, error):
+        self.last_error = error
+        if self.attempts < self.MAX_ATTEMPTS:
+            self.status = 'PENDING'
+            self.run_after = timezone.now() + timedelta(
+                seconds=self.RETRY_BACKOFF_SECONDS * 2 ** (self.attempts - 1)
+            )
+        else:
+            self.status = 'FAILED'
+        self.save(update_fields=['status', 'last_error', 'run_after'])
+
+class Checkout(models.Model):
+    """The outcome of one PayPal order, keyed by the order ID.
+
+    The first callback for an order claims the artwork with a conditional
+    ``UPDATE ... WHERE status = 'FOR_SALE'`` and queues the emails in the same
+    transaction. Retried and duplicate callbacks find the record and get the
+    same answer without either happening again.
+    """
+    OUTCOME_CHOICES = [
+        ('SOLD', 'Sold'),
+        # Paid for after someone else bought it: needs a refund
+        ('UNAVAILABLE', 'Artwork unavailable'),
+    ]
+
+    order_id = models.CharField(max_length=128, unique=True)
+    artwork = models.ForeignKey(Artwork, on_delete=models.SET_NULL, null=True, related_name='checkouts')
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES)
+    customer_name = models.CharField(max_length=200)
+    customer_email = models.EmailField()
+    customer_phone = models.CharField(max_length=50, blank=True)
+    customer_address = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
 
-        self.thumbnail_image.save(new_filename, ContentFile(buffer.getvalue()), save=False)
+    # customer_address is a TEXT column, which MySQL caps at 64KB
+    MAX_ADDRESS_LENGTH = 2000
+
+    def __str__(self):
+        return f"{self.order_id} ({self.get_outcome_display()})"
+
+    @classmethod
+    def clean_value(cls, field, value):
+        """``value`` cut to fit ``field``. Payer details come unvalidated from the PayPal
+        payload, and the order is already paid for: an overlong value mustn't fail the save."""
+        value = '' if value is None else str(value).strip()
+        return value[:cls._meta.get_field(field).max_length or cls.MAX_ADDRESS_LENGTH]
+
+    @classmethod
+    def process(cls, order_id, artwork, customer):
+        """The checkout for ``order_id``, recording it first if it is new.
+
+        ``customer`` holds the ``customer_*`` fields. Returns ``(checkout, created)``.
+        """
+        order_id = cls.clean_value('order_id', order_id)
+        customer = {field: cls.clean_value(field, value) for field, value in customer.items()}
+        existing = cls.objects.filter(order_id=order_id).first()
+        if existing is not None:
+            return existing, False
+        try:
+            with transaction.atomic():
+                sold = Artwork.objects.filter(pk=artwork.pk, status='FOR_SALE').update(
+                    status='SOLD', updated_at=timezone.now()
+                )
+                checkout = cls.objects.create(
+                    order_id=order_id, artwork=artwork, outcome='SOLD' if sold else 'UNAVAILABLE', **customer
+                )
+                checkout.queue_emails()
+                if sold:
+                    artwork.status = 'SOLD'
+                    # The update skips save(), and with it the signal that invalidates cached pages
+                    transaction.on_commit(bump_catalog_version)
+        except IntegrityError:
+            # A concurrent callback for the same order committed first; its
+            # conditional update made ours match nothing and this rolled it back
+            return cls.objects.get(order_id=order_id), False
+        return checkout, True
+
+    def queue_emails(self):
+        context = {
+            'artwork': self.artwork,
+            'order_id': self.order_id,
+            'customer_name': self.customer_name,
+            'customer_email': self.customer_email,
+            'customer_phone': self.customer_phone,
+            'customer_address': self.customer_address,
+        }
+        if self.outcome == 'UNAVAILABLE':
+            OutboundEmail.queue(
+                subject=f'Refund needed - {self.artwork.title}',
+                template='emails/checkout_unavailable.html',
+                context=context,
+                to=['aboydmobile@gmail.com'],  # Update this with your email
+                from_email='noreply@yourdomain.com',  # Update this with your email
+            )
+            return
+
+        # Confirmation email to customer
+        OutboundEmail.queue(
+            subject=f'Purchase Confirmation - {self.artwork.title}',
+            template='emails/purchase_confirmation.html',
+            context=context,
+            to=[self.customer_email],
+            from_email='noreply@yourdomain.com',  # Update this with your email
+        )
+
+        # Notification email to artist
+        OutboundEmail.queue(
+            subject=f'New Artwork Purchase - {self.artwork.title}',
+            template='emails/artist_notification.html',
+            context=context,
+            to=['aboydmobile@gmail.com'],  # Update this with your email
+            from_email='noreply@yourdomain.com',  # Update this with your email
+        )
 
 class CommissionRequest(models.Model):
     STATUS_CHOICES = [
@@ -136,6 +701,12 @@ class CommissionRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='commission_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='commission_status_created_idx'),
+        ]
+
     def __str__(self):
         return f"Commission Request from {self.name}"
 
@@ -157,7 +728,7 @@ class PayPalAccount(models.Model):
 
     @classmethod
     def get_active_account(cls):
-        return cls.objects.filter(is_active=True).first()
+        return site_cached('paypal_account', lambda: cls.objects.filter(is_active=True).first())
 
 class ModelApplication(models.Model):
     name = models.CharField(max_length=200)
@@ -184,7 +755,18 @@ class ModelApplication(models.Model):
 class ModelImage(models.Model):
     application = models.ForeignKey(ModelApplication, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='model_applications/')
+    thumbnail = models.ImageField(upload_to='model_applications/thumbnails/', null=True, blank=True,
+                                  editable=False, help_text="Upright review copy rendered in the background")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Image for {self.application.name}" 
\ No newline at end of file
+        return f"Image for {self.application.name}"
+
+    def generate_thumbnail(self):
+        with self.image.open('rb') as source:
+            _, _, data = render_review_thumbnail(
+                source, settings.MODEL_IMAGE_THUMBNAIL_SIZE, settings.ARTWORK_DERIVATIVE_QUALITY['jpeg']
+            )
+        name = f'{os.path.splitext(os.path.basename(self.image.name))[0]}.jpg'
+        self.thumbnail.save(name, ContentFile(data), save=False)
+        self.save(update_fields=['thumbnail']) 
\ No newline at end of file
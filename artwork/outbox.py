@@ -0,0 +1,42 @@
+"""Delivery of queued ``OutboundEmail`` rows over one SMTP connection."""
+import traceback
+from django.core.mail import get_connection
+
+
+def send_batch(emails, connection):
+    """Send ``emails`` over ``connection``, opening it once for the whole batch.
+
+    Each email is marked sent or failed (and rescheduled) on its own, so one
+    rejected recipient does not hold back the rest. Returns ``(sent, failed)``.
+    """
+    sent = failed = 0
+    pending = list(emails)
+    try:
+        connection.open()
+        while pending:
+            email = pending.pop(0)
+            try:
+                connection.send_messages([email.to_message()])
+            except Exception:
+                email.mark_failed(traceback.format_exc())
+                failed += 1
+                # The server may have dropped us; carry on over a fresh connection
+                connection.close()
+                connection.open()
+            else:
+                email.mark_sent()
+                sent += 1
+    except Exception:
+        # No connection: the rest go back to the queue with backoff
+        error = traceback.format_exc()
+        for email in pending:
+            email.mark_failed(error)
+        failed += len(pending)
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def open_connection(**overrides):
+    """An SMTP connection from the EMAIL_* settings, with ``overrides`` (host, port...)."""
+    return get_connection(fail_silently=False, **{k: v for k, v in overrides.items() if v is not None})
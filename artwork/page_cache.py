@@ -0,0 +1,151 @@
+"""Full-page cache for the public catalog views.
+
+Each URL has one cache entry holding the rendered response and the catalog
+and site versions it was rendered under; a version bump (see
+``artwork.signals``) makes every entry stale at once. Only one request
+re-renders a stale or missing page, guarded by a ``cache.add`` lock, which
+the local-memory, file-based and Redis backends all provide. Meanwhile other
+requests get the stale copy, or wait briefly for the fresh one when there is
+none. Authenticated users and responses that set cookies are never cached.
+Cached responses carry ``compressed_cache_key``, under which
+``artwork.middleware`` keeps their compressed bodies beside the entry.
+Async views get the same behaviour, with the cache work done off the event
+loop.
+"""
+import asyncio
+import hashlib
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from .cache import catalog_version, site_version, static_version
+
+# How long a renderer may hold the lock before another request takes over
+LOCK_TIMEOUT = 30
+
+# How long requests without a stale copy wait for the renderer, in seconds
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.05
+
+
+def _key(request):
+    return 'page:' + hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+
+def _cacheable(request, user):
+    return request.method == 'GET' and not (user is not None and user.is_authenticated)
+
+
+def _lookup(request):
+    """``(key, version, entry)`` for the cached copy of this page; ``entry`` may be missing or stale."""
+    key = _key(request)
+    return key, (catalog_version(), site_version(), static_version()), cache.get(key)
+
+
+def _fresh(entry, version):
+    return entry is not None and entry['version'] == version
+
+
+def _lock(key):
+    return cache.add(f'{key}:lock', 1, LOCK_TIMEOUT)
+
+
+def _unlock(key):
+    cache.delete(f'{key}:lock')
+
+
+def _compressed_key(key, version):
+    # Per version, so a re-rendered page never picks up the old page's compressed body
+    return f'{key}:' + hashlib.md5(repr(version).encode()).hexdigest()
+
+
+def _store(key, version, response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return
+    entry = {
+        'version': version,
+        'content': response.content,
+        'headers': dict(response.headers),
+    }
+    cache.set(key, entry, settings.ARTWORK_PAGE_CACHE_TIMEOUT)
+    response.compressed_cache_key = _compressed_key(key, version)
+
+
+def _response(key, entry, stale=False):
+    response = HttpResponse(entry['content'])
+    for header, value in entry['headers'].items():
+        response[header] = value
+    response.compressed_cache_key = _compressed_key(key, entry['version'])
+    if stale:
+        # An ETag of its own, so clients revalidate it rather than keep it
+        # under the current version's ETag
+        response['ETag'] = '"stale-%s"' % hashlib.md5(repr(entry['version']).encode()).hexdigest()
+    return response
+
+
+def cache_catalog_page(view):
+    """Serve ``view`` from the page cache until the catalog or site changes."""
+    if iscoroutinefunction(view):
+        return _acache_catalog_page(view)
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not _cacheable(request, getattr(request, 'user', None)):
+            return view(request, *args, **kwargs)
+
+        key, version, entry = _lookup(request)
+        if _fresh(entry, version):
+            return _response(key, entry)
+
+        if _lock(key):
+            try:
+                response = view(request, *args, **kwargs)
+                _store(key, version, response)
+            finally:
+                _unlock(key)
+            return response
+
+        # Another request is rendering this page
+        if entry is not None:
+            return _response(key, entry, stale=True)
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            entry = cache.get(key)
+            if _fresh(entry, version):
+                return _response(key, entry)
+        return view(request, *args, **kwargs)
+    return wrapped
+
+
+def _acache_catalog_page(view):
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        user = await request.auser() if hasattr(request, 'auser') else None
+        if not _cacheable(request, user):
+            return await view(request, *args, **kwargs)
+
+        key, version, entry = await sync_to_async(_lookup)(request)
+        if _fresh(entry, version):
+            return _response(key, entry)
+
+        if await sync_to_async(_lock)(key):
+            try:
+                response = await view(request, *args, **kwargs)
+                await sync_to_async(_store)(key, version, response)
+            finally:
+                await sync_to_async(_unlock)(key)
+            return response
+
+        if entry is not None:
+            return _response(key, entry, stale=True)
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(WAIT_INTERVAL)
+            entry = await cache.aget(key)
+            if _fresh(entry, version):
+                return _response(key, entry)
+        return await view(request, *args, **kwargs)
+    return wrapped
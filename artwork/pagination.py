@@ -0,0 +1,269 @@
+"""Keyset (cursor) pagination for the artwork catalog.
+
+Instead of ``COUNT(*)`` plus a growing ``OFFSET``, each page asks for the rows
+that sort strictly after the last row of the previous page, e.g. for
+``(-created_at, -id)``::
+
+    WHERE created_at < :c OR (created_at = :c AND id < :id)
+
+which an index on the ordering columns answers in the same time on page 500
+as on page 1. NULLs are treated as the smallest value (first ascending, last
+descending), matching SQLite and MySQL and pinned explicitly for other
+backends. Cursors are opaque base64 tokens carrying the boundary row's sort
+values and the ordering they belong to.
+"""
+import base64
+import binascii
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _ordering_fields(queryset):
+    """``[(field_name, descending)]`` for the queryset's ordering plus an ``id`` tie-breaker."""
+    fields = []
+    for item in queryset.query.order_by or ['-id']:
+        if not isinstance(item, str) or item == '?' or '__' in item:
+            raise ValueError(f'Keyset pagination cannot order by {item!r}')
+        name = item.lstrip('-')
+        name = 'id' if name == 'pk' else name
+        try:
+            queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # e.g. an annotation such as a search rank
+            raise ValueError(f'Keyset pagination cannot order by {item!r}')
+        fields.append((name, item.startswith('-')))
+    if 'id' not in [name for name, _ in fields]:
+        # Follow the direction of the last column so a composite index can serve it
+        fields.append(('id', fields[-1][1]))
+    return fields
+
+
+def supports_keyset(queryset):
+    """Whether ``queryset``'s ordering is made of plain columns keyset pages can seek on."""
+    try:
+        _ordering_fields(queryset)
+    except ValueError:
+        return False
+    return True
+
+
+def keyset_columns(queryset):
+    """Columns ``.values()`` rows of ``queryset`` must carry for keyset cursors."""
+    return [name for name, _ in _ordering_fields(queryset)] if supports_keyset(queryset) else []
+
+
+def _order_by(queryset, fields, reverse=False):
+    # Only spell out NULL placement where the backend's default differs: MySQL
+    # emulates NULLS FIRST/LAST with an extra sort key that defeats indexes
+    pin_nulls = connections[queryset.db].features.nulls_order_largest
+    expressions = []
+    for name, descending in fields:
+        descending = descending != reverse
+        nullable = pin_nulls and queryset.model._meta.get_field(name).null
+        if descending:
+            expressions.append(F(name).desc(nulls_last=True) if nullable else F(name).desc())
+        else:
+            expressions.append(F(name).asc(nulls_first=True) if nullable else F(name).asc())
+    return expressions
+
+
+def _after(model, name, descending, value):
+    """Rows whose ``name`` sorts strictly after ``value``."""
+    if value is None:
+        # NULL is the smallest value: everything non-null follows it ascending,
+        # nothing follows it descending
+        return Q(**{f'{name}__isnull': False}) if not descending else Q(pk__in=[])
+    if descending:
+        condition = Q(**{f'{name}__lt': value})
+        if model._meta.get_field(name).null:
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+    return Q(**{f'{name}__gt': value})
+
+
+def _keyset_filter(model, fields, values, reverse=False):
+    condition = Q(pk__in=[])
+    equal_so_far = Q()
+    for (name, descending), value in zip(fields, values):
+        condition |= equal_so_far & _after(model, name, descending != reverse, value)
+        equal_so_far &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+
+    # A redundant range on the leading column lets the index seek instead of
+    # scanning up to the boundary and testing the OR on each row
+    name, descending = fields[0]
+    if values[0] is not None:
+        if descending != reverse:
+            bound = Q(**{f'{name}__lte': values[0]})
+            if model._meta.get_field(name).null:
+                bound |= Q(**{f'{name}__isnull': True})
+        else:
+            bound = Q(**{f'{name}__gte': values[0]})
+        condition &= bound
+    return condition
+
+
+def _signature(fields):
+    return ','.join(('-' if descending else '') + name for name, descending in fields)
+
+
+def encode_cursor(fields, row, reverse=False):
+    # Rows are model instances or .values() dicts
+    values = [row[name] if isinstance(row, dict) else getattr(row, name) for name, _ in fields]
+    payload = {
+        'o': _signature(fields),
+        'v': [None if v is None else (v.isoformat() if hasattr(v, 'isoformat') else str(v)) for v in values],
+        'r': reverse,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def cursor_for(queryset, row):
+    """Cursor for the page that starts after ``row`` in ``queryset``'s ordering."""
+    return encode_cursor(_ordering_fields(queryset), row)
+
+
+def decode_cursor(model, fields, token):
+    """Return ``(values, reverse)`` for a cursor token produced for ``fields``."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload['o'] != _signature(fields) or len(payload['v']) != len(fields):
+            raise InvalidCursor
+        values = [
+            None if raw is None else model._meta.get_field(name).to_python(raw)
+            for (name, _), raw in zip(fields, payload['v'])
+        ]
+        return values, bool(payload.get('r'))
+    except (InvalidCursor, KeyError, TypeError, ValueError, ValidationError, binascii.Error):
+        raise InvalidCursor('Invalid cursor')
+
+
+def _keyset_query(queryset, cursor):
+    fields = _ordering_fields(queryset)
+    values, reverse = decode_cursor(queryset.model, fields, cursor) if cursor else (None, False)
+    page = queryset.order_by(*_order_by(queryset, fields, reverse))
+    if values is not None:
+        page = page.filter(_keyset_filter(queryset.model, fields, values, reverse))
+    return page, fields, values, reverse
+
+
+def keyset_queryset(queryset, cursor=None):
+    """The unsliced queryset ``keyset_page`` runs, e.g. to ``explain()`` it."""
+    return _keyset_query(queryset, cursor)[0]
+
+
+def keyset_page(queryset, cursor, page_size):
+    """Fetch one page of ``queryset`` after ``cursor``.
+
+    Returns ``(rows, next_cursor, previous_cursor)``; the cursors are ``None``
+    at either end of the results.
+    """
+    page, fields, values, reverse = _keyset_query(queryset, cursor)
+    rows = list(page[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if has_more or reverse:
+            next_cursor = encode_cursor(fields, rows[-1])
+        if values is not None and (has_more or not reverse):
+            previous_cursor = encode_cursor(fields, rows[0], reverse=True)
+    return rows, next_cursor, previous_cursor
+
+
+def catalog_page(queryset, params, page_size):
+    """One page for a template view, plus the query parameters of the next page.
+
+    Keyset pages where the ordering allows, numbered pages otherwise (e.g.
+    relevance-ranked search results). Raises ``InvalidCursor``.
+    """
+    if supports_keyset(queryset):
+        rows, next_cursor, _ = keyset_page(queryset, params.get('cursor'), page_size)
+        return rows, ({'cursor': next_cursor} if next_cursor else None)
+    page = Paginator(queryset, page_size).get_page(params.get('page'))
+    return list(page), ({'page': page.next_page_number()} if page.has_next() else None)
+
+
+class KeysetPagination(BasePagination):
+    """Opaque-cursor pagination over the queryset's own ordering.
+
+    ``?count=1`` adds the total, which is the only query that still scans the
+    whole result set.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            rows, self.next_cursor, self.previous_cursor = keyset_page(
+                queryset, request.query_params.get(self.cursor_query_param), page_size
+            )
+        except InvalidCursor as e:
+            raise NotFound(str(e))
+        self.count = queryset.count() if request.query_params.get(self.count_query_param) else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        body = {
+            'next': self.get_link(self.next_cursor),
+            'previous': self.get_link(self.previous_cursor),
+            'results': data,
+        }
+        if self.count is not None:
+            body = {'count': self.count, **body}
+        return Response(body)
+
+
+class CatalogPagination(KeysetPagination):
+    """Keyset pages by default; ``?page=N`` keeps numbered pages working for old
+    clients, and orderings keyset pages cannot seek on (search relevance) use them too."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.numbered = None
+        if 'page' in request.query_params or not supports_keyset(queryset):
+            self.numbered = StandardResultsSetPagination()
+            return self.numbered.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.numbered is not None:
+            return self.numbered.get_paginated_response(data)
+        return super().get_paginated_response(data)
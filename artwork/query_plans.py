@@ -0,0 +1,99 @@
+"""EXPLAIN checks for the hot catalog queries.
+
+Each catalog filter and sort is backed by a composite index (see
+``Artwork.Meta``). A query whose plan falls back to a full table scan plus a
+sort is a regression: fine on a small catalog, slow on a large one.
+``artwork.tests`` checks every plan against a seeded test database, and
+``manage.py check_query_plans`` against the configured one.
+"""
+import json
+import re
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from .models import Artwork, CommissionRequest
+from .pagination import cursor_for, keyset_queryset
+from .similarity import similar_artworks
+from .views import ArtworkViewSet, CommissionRequestViewSet
+
+SUPPORTED_VENDORS = ('sqlite', 'mysql')
+
+
+def api_queryset(viewset, params):
+    """The queryset a list request with ``params`` would paginate."""
+    view = viewset(request=Request(APIRequestFactory().get('/', params)), format_kwarg=None, action='list')
+    return view.filter_queryset(view.get_queryset())
+
+
+def hot_queries():
+    """``(name, queryset)`` for every catalog query that must stay on an index."""
+    queries = [
+        ('home featured', Artwork.objects.filter(status='FOR_SALE').order_by('-price')[:3]),
+        ('home latest', Artwork.objects.order_by('-created_at')[:25]),
+        ('artwork_detail similar', similar_artworks(1, 3)),
+        ('artwork_detail fallback', Artwork.objects.filter(medium='OIL', category='PORTRAIT').exclude(id=1)
+            .exclude(status='NOT_AVAILABLE').order_by('-created_at')[:3]),
+        ('gallery', Artwork.objects.order_by(*Artwork.SORT_ORDERINGS['newest'])),
+        ('gallery status', Artwork.objects.filter(status='FOR_SALE').order_by(*Artwork.SORT_ORDERINGS['newest'])),
+        ('gallery medium+category', Artwork.objects.filter(medium='OIL', category='FIGURE')
+            .order_by(*Artwork.SORT_ORDERINGS['newest'])),
+    ]
+    for sort in Artwork.SORT_ORDERINGS:
+        queries.append((f'api sort={sort}', api_queryset(ArtworkViewSet, {'sort': sort})))
+    queries.append(('api status', api_queryset(ArtworkViewSet, {'status': 'SOLD'})))
+    queries.append(('api medium+category', api_queryset(ArtworkViewSet, {'medium': 'GRAPHITE', 'category': 'PORTRAIT'})))
+    queries.append(('commissions', api_queryset(CommissionRequestViewSet, {})))
+    queries.append(('commissions status', api_queryset(CommissionRequestViewSet, {'status': 'PENDING'})))
+
+    # Paginated artwork queries run as keyset pages: check the first and a deep one
+    expanded = []
+    for name, queryset in queries:
+        if queryset.model is Artwork and not queryset.query.is_sliced:
+            expanded.append((f'{name} (page 1)', keyset_queryset(queryset)[:21]))
+            boundary = queryset[200:201].first()
+            if boundary is not None:
+                expanded.append((f'{name} (deep page)', keyset_queryset(queryset, cursor_for(queryset, boundary))[:21]))
+        else:
+            expanded.append((name, queryset))
+    return expanded
+
+
+def sqlite_problems(plan):
+    full_scan = re.search(r'\bSCAN \w+$', plan, re.MULTILINE)
+    temp_sort = 'USE TEMP B-TREE FOR ORDER BY' in plan
+    return ['full table scan', 'temp B-tree sort'] if full_scan and temp_sort else []
+
+
+def mysql_problems(plan):
+    def walk(node):
+        if isinstance(node, dict):
+            yield node
+            for value in node.values():
+                yield from walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                yield from walk(value)
+
+    nodes = list(walk(json.loads(plan)))
+    full_scan = any(node.get('access_type') == 'ALL' for node in nodes)
+    filesort = any(node.get('using_filesort') for node in nodes)
+    return ['full table scan', 'filesort'] if full_scan and filesort else []
+
+
+def explain(queryset):
+    """``(plan, problems)`` for ``queryset`` on the default database."""
+    if connection.vendor == 'sqlite':
+        plan = queryset.explain()
+        return plan, sqlite_problems(plan)
+    plan = queryset.explain(format='json')
+    return plan, mysql_problems(plan)
+
+
+def analyze():
+    """Refresh the planner's statistics, e.g. after seeding."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('ANALYZE')
+        else:
+            for model in (Artwork, CommissionRequest):
+                cursor.execute(f'ANALYZE TABLE {connection.ops.quote_name(model._meta.db_table)}')
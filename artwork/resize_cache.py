@@ -0,0 +1,166 @@
+"""Disk cache for on-demand artwork resizes.
+
+Variants are rendered on first request and kept under
+``ARTWORK_RESIZE_CACHE_DIR``, named after the source file's name, size and
+mtime, so a replaced image never serves an old variant. Every hit refreshes
+the file's mtime, and once the directory grows past
+``ARTWORK_RESIZE_CACHE_MAX_BYTES`` the least recently used files are evicted.
+Each process keeps a running total of the directory's size from its last scan
+plus what it has written since, and only walks the directory when that total
+is over the cap or the scan is older than ``RESCAN_INTERVAL`` (other workers
+write too). Concurrent misses for the same variant are coalesced with a
+per-variant lock (a thread lock inside the process plus ``flock`` on a lock
+file across gunicorn workers), so only one of them renders.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from .imaging import FORMATS, render_width
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the process only
+    fcntl = None
+
+# path -> [lock, number of threads holding or waiting for it]
+_locks = {}
+_locks_guard = threading.Lock()
+
+# Evict down to this fraction of the cap, leaving room for writes before the next eviction
+EVICT_TO = 0.9
+
+# Seconds before this process's running total is refreshed from a scan
+RESCAN_INTERVAL = 300
+
+_usage = {'bytes': None, 'scanned_at': 0.0}
+_usage_guard = threading.Lock()
+
+
+def source_version(artwork):
+    """A digest of the source image's name, size and mtime."""
+    storage, name = artwork.image.storage, artwork.image.name
+    try:
+        token = f'{name}:{storage.size(name)}:{storage.get_modified_time(name).timestamp()}'
+    except NotImplementedError:
+        # A storage without mtimes; image_hash is reset whenever the image is replaced
+        token = f'{name}:{artwork.image_hash}'
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def variant_path(artwork, width, fmt):
+    name = f'{artwork.pk}-{source_version(artwork)[:16]}-{width}.{FORMATS[fmt][2]}'
+    return os.path.join(settings.ARTWORK_RESIZE_CACHE_DIR, str(artwork.pk % 256), name)
+
+
+@contextmanager
+def _variant_lock(path):
+    with _locks_guard:
+        entry = _locks.setdefault(path, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            if fcntl is None:
+                yield
+                return
+            with open(path + '.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _locks[path]
+
+
+def get_or_render(artwork, width, fmt):
+    """Return the path of the cached variant, rendering it if necessary."""
+    path = variant_path(artwork, width, fmt)
+    if _touch(path):
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _variant_lock(path):
+        # Another request may have rendered it while we waited
+        if _touch(path):
+            return path
+        with artwork.image.open('rb') as source:
+            data = render_width(source, width, fmt, settings.ARTWORK_DERIVATIVE_QUALITY[fmt])
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+    _written(path, len(data), settings.ARTWORK_RESIZE_CACHE_MAX_BYTES)
+    return path
+
+
+def open_variant(artwork, width, fmt):
+    """The cached variant opened for reading, rendered again if it is evicted before it opens."""
+    for attempt in range(2):
+        path = get_or_render(artwork, width, fmt)
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            if attempt:
+                raise
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _written(path, size, max_bytes):
+    with _usage_guard:
+        stale = _usage['bytes'] is None or time.monotonic() - _usage['scanned_at'] > RESCAN_INTERVAL
+        if not stale:
+            _usage['bytes'] += size
+        scan = stale or _usage['bytes'] > max_bytes
+    if scan:
+        evict(max_bytes, keep=path)
+
+
+def evict(max_bytes, keep=None):
+    """Delete least recently used variants, except ``keep``, until the cache fits in ``max_bytes``."""
+    scanned_at = time.monotonic()
+    entries = []
+    total = 0
+    for root, _, files in os.walk(settings.ARTWORK_RESIZE_CACHE_DIR):
+        for name in files:
+            if name.endswith(('.lock', '.tmp')):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    removed = 0
+    if total > max_bytes:
+        for _, size, path in sorted(entries):
+            if total <= max_bytes * EVICT_TO:
+                break
+            if path == keep:
+                continue
+            for stale in (path, path + '.lock'):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+    with _usage_guard:
+        _usage['bytes'], _usage['scanned_at'] = total, scanned_at
+    return removed
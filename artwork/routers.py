@@ -0,0 +1,44 @@
+"""Read/write routing for a MySQL primary with a read replica.
+
+Installed by settings when a ``replica`` database is configured. Catalog
+models (artwork and what the public pages show with it) are read from the
+replica; everything written on the request path (sales, emails, applications,
+commissions, derivative jobs, sessions) is read from and written to the
+primary, so those flows never see replication lag. Reads inside a
+transaction on the primary stay on the primary as well.
+
+Catalog reads also stay on the primary for ``ARTWORK_REPLICA_PIN_SECONDS``
+after any catalog or site version bump. The page cache, facet cache, ETags
+and per-process site config all refill right after a bump, and a lagging
+replica would otherwise have its pre-write rows (say, a just-sold piece still
+for sale) cached under the new version until the next bump or expiry.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from .cache import changed_within
+
+REPLICA = 'replica'
+
+CATALOG_MODELS = {'artwork', 'artworkfeatures', 'similarartwork', 'sitesettings', 'paypalaccount'}
+
+
+class CatalogReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'artwork' or model._meta.model_name not in CATALOG_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # e.g. the similarity update re-reading lists it is rewriting
+            return DEFAULT_DB_ALIAS
+        if changed_within(settings.ARTWORK_REPLICA_PIN_SECONDS):
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
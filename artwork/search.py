@@ -0,0 +1,195 @@
+"""Ranked full-text search over the catalog and commission requests.
+
+SQLite uses an FTS5 table per model (``<table>_fts``, rowid = primary key)
+kept in sync by the signals in ``artwork.signals``; ranking is FTS5's BM25
+with titles weighted above descriptions, and snippets come from FTS5's
+``snippet()``. MySQL uses a FULLTEXT index in boolean mode, which InnoDB
+maintains itself. Any other backend falls back to ``icontains``. Every term
+is a prefix match, and all terms must match.
+"""
+import re
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from rest_framework import filters
+
+# Searchable fields per model (label -> fields, most important first), and
+# their BM25 weights
+SEARCH_FIELDS = {
+    'artwork.Artwork': ('title', 'description'),
+    'artwork.CommissionRequest': ('name', 'description'),
+}
+FIELD_WEIGHTS = (10.0, 1.0)
+
+# Snippet markers, replaced with <mark> once the text has been escaped
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+SNIPPET_WORDS = 16
+
+# (alias, database name, table) -> whether the FTS5 table exists
+_fts_tables = {}
+
+
+def search_fields(model):
+    return SEARCH_FIELDS.get(model._meta.label)
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def terms(query):
+    return re.findall(r'\w+', query or '')
+
+
+def has_fts(connection, model):
+    """Whether ``model`` has an FTS5 table (SQLite builds without FTS5 skip it)."""
+    if connection.vendor != 'sqlite':
+        return False
+    key = (connection.alias, connection.settings_dict['NAME'], fts_table(model))
+    if key not in _fts_tables:
+        with connection.cursor() as cursor:
+            _fts_tables[key] = fts_table(model) in connection.introspection.table_names(cursor)
+    return _fts_tables[key]
+
+
+def search(queryset, query):
+    """Filter ``queryset`` to rows matching every term of ``query``, best first.
+
+    Rows are annotated with ``search_rank`` (higher is better) and, on SQLite,
+    ``search_snippet``. The queryset's existing ordering breaks rank ties.
+    """
+    model = queryset.model
+    fields = search_fields(model)
+    words = terms(query)
+    if not fields or not words:
+        return queryset
+
+    connection = connections[queryset.db]
+    ordering = list(queryset.query.order_by)
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+
+    if has_fts(connection, model):
+        fts = connection.ops.quote_name(fts_table(model))
+        weights = ', '.join(str(w) for w in FIELD_WEIGHTS[:len(fields)])
+        match = ' '.join('"%s"*' % word for word in words)
+        queryset = queryset.extra(
+            tables=[fts_table(model)],
+            where=[f'{fts}.rowid = {table}.{pk}', f'{fts} MATCH %s'],
+            params=[match],
+            select={
+                # bm25() is lower-is-better
+                'search_rank': f'-bm25({fts}, {weights})',
+                'search_snippet': f"snippet({fts}, -1, char(2), char(3), '…', {SNIPPET_WORDS})",
+            },
+        )
+    elif connection.vendor == 'mysql' and [w for w in words if len(w) >= 3]:
+        columns = ', '.join(f'{table}.{connection.ops.quote_name(f)}' for f in fields)
+        # InnoDB ignores terms shorter than innodb_ft_min_token_size (3)
+        match = ' '.join(f'+{word}*' for word in words if len(word) >= 3)
+        rank = RawSQL(f'MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)', [match])
+        queryset = queryset.annotate(search_rank=rank).filter(search_rank__gt=0)
+    else:
+        for word in words:
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f'{field}__icontains': word})
+            queryset = queryset.filter(condition)
+        return queryset.annotate(search_rank=Value(0.0))
+
+    return queryset.order_by('-search_rank', *ordering)
+
+
+def highlight(text):
+    """Escape marker-delimited ``text`` and turn the markers into ``<mark>``."""
+    html = escape(text).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    return mark_safe(html)
+
+
+def snippet(obj, query):
+    """Highlighted HTML excerpt of ``obj`` around the first match of ``query``."""
+    raw = getattr(obj, 'search_snippet', None)
+    if raw is None:
+        raw = _snippet(obj, terms(query))
+    return highlight(raw) if raw else ''
+
+
+def _snippet(obj, words):
+    if not words:
+        return ''
+    pattern = re.compile(r'\b(?:%s)\w*' % '|'.join(re.escape(w) for w in words), re.IGNORECASE)
+    texts = [getattr(obj, field) or '' for field in search_fields(type(obj))]
+    text = next((t for t in reversed(texts) if pattern.search(t)), texts[-1])
+
+    tokens = text.split()
+    first = next((i for i, token in enumerate(tokens) if pattern.search(token)), 0)
+    start = max(0, first - SNIPPET_WORDS // 2)
+    excerpt = ' '.join(tokens[start:start + SNIPPET_WORDS])
+    excerpt = pattern.sub(lambda m: HIGHLIGHT_START + m.group(0) + HIGHLIGHT_END, excerpt)
+    return ('…' if start else '') + excerpt + ('…' if start + SNIPPET_WORDS < len(tokens) else '')
+
+
+def index(instance, using=DEFAULT_DB_ALIAS):
+    """Write ``instance``'s searchable text to its FTS5 table, if it has one."""
+    connection = connections[using]
+    model = type(instance)
+    if not search_fields(model) or not has_fts(connection, model):
+        return
+    fts = connection.ops.quote_name(fts_table(model))
+    fields = search_fields(model)
+    columns = ', '.join(connection.ops.quote_name(f) for f in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {fts} WHERE rowid = %s', [instance.pk])
+        cursor.execute(
+            f'INSERT INTO {fts} (rowid, {columns}) VALUES (%s{", %s" * len(fields)})',
+            [instance.pk] + [getattr(instance, f) or '' for f in fields],
+        )
+
+
+def unindex(instance, using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    model = type(instance)
+    if not search_fields(model) or not has_fts(connection, model):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {connection.ops.quote_name(fts_table(model))} WHERE rowid = %s', [instance.pk])
+
+
+def reindex(model, ids=None, using=DEFAULT_DB_ALIAS):
+    """Rebuild ``model``'s FTS5 rows (all, or just ``ids``) from the table.
+
+    For writes that bypass signals, such as ``bulk_create``.
+    """
+    connection = connections[using]
+    if not search_fields(model) or not has_fts(connection, model):
+        return
+    fts = connection.ops.quote_name(fts_table(model))
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    columns = ', '.join(connection.ops.quote_name(f) for f in search_fields(model))
+    coalesced = ', '.join(f"COALESCE({connection.ops.quote_name(f)}, '')" for f in search_fields(model))
+    with connection.cursor() as cursor:
+        if ids is None:
+            cursor.execute(f'DELETE FROM {fts}')
+            cursor.execute(f'INSERT INTO {fts} (rowid, {columns}) SELECT {pk}, {coalesced} FROM {table}')
+            return
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {fts} WHERE rowid IN ({placeholders})', batch)
+            cursor.execute(
+                f'INSERT INTO {fts} (rowid, {columns}) SELECT {pk}, {coalesced} FROM {table} WHERE {pk} IN ({placeholders})',
+                batch,
+            )
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """``?search=`` backed by the full-text index, ordered by relevance."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return search(queryset, query)
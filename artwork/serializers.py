@@ -1,19 +1,144 @@
 from rest_framework import serializers
-from .models import Artwork, CommissionRequest
+from . import search
+from .models import Artwork, CommissionRequest, media_url
 
-class ArtworkSerializer(serializers.ModelSerializer):
+
+class SearchSnippetMixin(serializers.Serializer):
+    search_snippet = serializers.SerializerMethodField()
+
+    def get_search_snippet(self, obj):
+        # Highlighted excerpt when the list was filtered with ?search=
+        request = self.context.get('request')
+        query = request.query_params.get('search') if request else None
+        return search.snippet(obj, query) if query else None
+
+class ArtworkSerializer(SearchSnippetMixin, serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     medium_display = serializers.CharField(source='get_medium_display', read_only=True)
     category_display = serializers.CharField(source='get_category_display', read_only=True)
+    srcset = serializers.CharField(read_only=True)
+    sources = serializers.ReadOnlyField()
+    tile_width = serializers.ReadOnlyField()
+    tile_height = serializers.ReadOnlyField()
 
     class Meta:
         model = Artwork
-        fields = ['id', 'title', 'description', 'image', 'tile_image', 'thumbnail_image', 'status', 'status_display', 
+        fields = ['id', 'title', 'description', 'image', 'tile_image', 'thumbnail_image', 'srcset', 'sources',
+                 'image_width', 'image_height', 'tile_width', 'tile_height', 'placeholder', 'dominant_color',
+                 'status', 'status_display', 
                  'price', 'medium', 'medium_display', 'category', 'category_display', 
-                 'created_at', 'updated_at']
+                 'created_at', 'updated_at', 'search_snippet']
 
-class CommissionRequestSerializer(serializers.ModelSerializer):
+class CommissionRequestSerializer(SearchSnippetMixin, serializers.ModelSerializer):
     class Meta:
         model = CommissionRequest
         fields = '__all__'
-        read_only_fields = ('status',) 
\ No newline at end of file
+        read_only_fields = ('status',)
+
+
+class ValuesListSerializer:
+    """Read-only list rendering of ``.values()`` rows, matching ``serializer_class``.
+
+    Skips model instances and DRF's per-field machinery for list responses:
+    choice labels come from precomputed maps, file URLs straight from the
+    storage, and only the columns behind the requested ``fields`` are
+    selected. Fields that need model logic (``computed_fields``, field ->
+    columns) are rendered from a transient instance built from the row.
+    """
+    serializer_class = None
+    computed_fields = {}
+    # Serializer fields whose to_representation is the identity for database values
+    passthrough = (serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+                   serializers.BooleanField, serializers.ReadOnlyField, serializers.JSONField)
+
+    def __init__(self, fields=None, context=None):
+        self.context = context or {}
+        self.serializer = self.serializer_class(context=self.context)
+        self.model = self.serializer.Meta.model
+        self.concrete = {f.attname for f in self.model._meta.concrete_fields}
+        self.fields = self._select(list(self.serializer.fields), fields)
+
+        request = self.context.get('request')
+        self.base_url = request.build_absolute_uri('/')[:-1] if request else ''
+        self.columns = {}
+        self.converters = []
+        self.computed = []
+        for name in self.fields:
+            field = self.serializer.fields[name]
+            if name in self.computed_fields:
+                self.computed.append((name, field))
+                self.columns.update(dict.fromkeys(self.computed_fields[name]))
+                continue
+            column, convert = self._converter(field)
+            self.converters.append((name, column, convert))
+            self.columns[column] = None
+
+    @staticmethod
+    def _select(available, fields):
+        """Sparse fieldset: the comma-separated ``fields`` in serializer order, or all."""
+        if not fields:
+            return available
+        requested = {name.strip() for name in fields.split(',') if name.strip()}
+        unknown = requested.difference(available)
+        if unknown:
+            raise serializers.ValidationError({'fields': f'Unknown field(s): {", ".join(sorted(unknown))}'})
+        return [name for name in available if name in requested]
+
+    def _converter(self, field):
+        if field.source.startswith('get_') and field.source.endswith('_display'):
+            column = field.source[len('get_'):-len('_display')]
+            labels = dict(self.model._meta.get_field(column).flatchoices)
+            return column, lambda value: labels.get(value, value)
+        if isinstance(field, serializers.FileField):
+            storage = self.model._meta.get_field(field.source).storage
+            return field.source, lambda name: self._url(storage, name)
+        if isinstance(field, self.passthrough):
+            return field.source, None
+        return field.source, field.to_representation
+
+    def _url(self, storage, name):
+        if not name:
+            return None
+        url = media_url(storage, name)
+        return self.base_url + url if url.startswith('/') else url
+
+    def values(self, queryset, *extra):
+        """``queryset`` as ``.values()`` rows with the columns these fields need, plus ``extra``."""
+        selectable = self.concrete | set(queryset.query.extra_select) | set(queryset.query.annotations)
+        names = [column for column in self.columns if column in selectable]
+        return queryset.values(*dict.fromkeys(names + list(extra)))
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, convert in self.converters:
+            value = row[column]
+            data[name] = value if value is None or convert is None else convert(value)
+        if self.computed:
+            instance = self.model(**{k: v for k, v in row.items() if k in self.concrete})
+            for key in row.keys() - self.concrete:
+                setattr(instance, key, row[key])
+            for name, field in self.computed:
+                attribute = field.get_attribute(instance)
+                data[name] = None if attribute is None else field.to_representation(attribute)
+        # Same key order as the full serializer
+        return {name: data[name] for name in self.fields}
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class ArtworkValuesSerializer(ValuesListSerializer):
+    serializer_class = ArtworkSerializer
+    computed_fields = {
+        'srcset': ('image', 'renditions'),
+        'sources': ('image', 'renditions'),
+        'tile_width': ('image', 'tile_image', 'renditions', 'image_width', 'image_height'),
+        'tile_height': ('image', 'tile_image', 'renditions', 'image_width', 'image_height'),
+        'search_snippet': ('title', 'description', 'search_snippet'),
+    }
+
+
+# What the gallery and home page cards render, for ?fields=
+CARD_FIELDS = ['id', 'title', 'description', 'image', 'tile_image', 'srcset', 'sources', 'tile_width',
+               'tile_height', 'placeholder', 'dominant_color', 'status', 'status_display', 'price',
+               'medium_display', 'category_display', 'search_snippet']
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from . import search
+from .cache import bump_catalog_version, bump_site_version
+
+
+def update_search_index(sender, instance, using, update_fields=None, **kwargs):
+    # Derivative and status updates save with update_fields and leave the text alone
+    if update_fields is not None and not set(update_fields) & set(search.search_fields(sender)):
+        return
+    search.index(instance, using=using)
+
+
+def remove_from_search_index(sender, instance, using, **kwargs):
+    search.unindex(instance, using=using)
+
+
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+def site_changed(sender, **kwargs):
+    bump_site_version()
+
+
+def status_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Available artworks appear in other artworks' similar lists, unavailable ones don't
+    if created or (update_fields is not None and 'status' not in update_fields):
+        return
+    if getattr(instance, '_loaded_status', instance.status) != instance.status:
+        from . import similarity
+        if instance.status == 'NOT_AVAILABLE':
+            similarity.withdraw(instance)
+        similarity.mark_stale([instance.pk])
+    instance._loaded_status = instance.status
+
+
+def artwork_deleted(sender, instance, **kwargs):
+    from .similarity import withdraw
+    withdraw(instance)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.ARTWORK_SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+def connect():
+    from .models import Artwork, CommissionRequest, PayPalAccount, SiteSettings
+
+    connection_created.connect(configure_sqlite, dispatch_uid='configure_sqlite')
+
+    post_save.connect(status_changed, sender=Artwork, dispatch_uid='similarity_status_changed')
+    pre_delete.connect(artwork_deleted, sender=Artwork, dispatch_uid='similarity_artwork_deleted')
+
+    post_save.connect(catalog_changed, sender=Artwork, dispatch_uid='catalog_changed_save')
+    post_delete.connect(catalog_changed, sender=Artwork, dispatch_uid='catalog_changed_delete')
+
+    for model in (SiteSettings, PayPalAccount):
+        post_save.connect(site_changed, sender=model, dispatch_uid=f'site_changed_save_{model._meta.label}')
+        post_delete.connect(site_changed, sender=model, dispatch_uid=f'site_changed_delete_{model._meta.label}')
+
+    for model in (Artwork, CommissionRequest):
+        post_save.connect(update_search_index, sender=model, dispatch_uid=f'search_index_{model._meta.label}')
+        post_delete.connect(remove_from_search_index, sender=model, dispatch_uid=f'search_unindex_{model._meta.label}')
@@ -0,0 +1,166 @@
+"""Precomputed "similar artwork" lists.
+
+Every artwork with an embedding keeps its top ``ARTWORK_SIMILAR_COUNT``
+neighbours (cosine similarity of ``Artwork.embedding``) as ``SimilarArtwork``
+rows, so a detail page reads k rows off an index instead of sorting the
+catalog. Artworks that are not available never appear in a list, though they
+still get a list of their own.
+
+Scoring an artwork means loading every embedding, so it stays off the request
+and save paths: a save that changes an embedding or status only flags the
+artwork ``similarity_stale``, and ``refresh_stale()`` (run by the
+``process_derivatives`` worker, or ``build_similarity_index --stale``) brings
+the flagged ones up to date in a batch. For each of them its own list is
+recomputed with a single matrix-vector product, the lists that held it are
+recomputed, and it is offered to every other list whose weakest entry it
+beats. An artwork that stops being available, or is deleted, is dropped from
+other lists straight away, which is one indexed delete. ``rebuild()``
+recomputes everything blockwise after bulk changes.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from .cache import bump_catalog_version
+from .features import load_embeddings
+from .models import Artwork, SimilarArtwork
+
+# Rows per matrix product in rebuild(); bounds memory at BLOCK_SIZE x catalog floats
+BLOCK_SIZE = 1000
+
+# Above this many changed artworks a full rebuild is cheaper than incremental updates
+REBUILD_THRESHOLD = 50
+
+
+def _load():
+    """``(ids, eligible, matrix)`` for every artwork with an embedding."""
+    rows = list(Artwork.objects.exclude(embedding=None).order_by('id').values_list('id', 'status', 'embedding'))
+    ids = np.array([pk for pk, _, _ in rows], dtype=np.int64)
+    eligible = np.array([status != 'NOT_AVAILABLE' for _, status, _ in rows], dtype=bool)
+    return ids, eligible, load_embeddings([embedding for _, _, embedding in rows])
+
+
+def _neighbours(scores, ids, eligible, artwork_id, k):
+    """The ``k`` best ``(id, score)`` pairs, excluding ``artwork_id`` and ineligible rows."""
+    scores = np.where(eligible & (ids != artwork_id), scores, -np.inf)
+    k = min(k, int(np.isfinite(scores).sum()))
+    if not k:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+def _links(artwork_id, neighbours):
+    return [SimilarArtwork(artwork_id=artwork_id, similar_id=pk, score=score) for pk, score in neighbours]
+
+
+def update_neighbours(artwork, loaded=None):
+    """Bring the lists in line with ``artwork``'s current embedding and status.
+
+    ``loaded`` is a ``_load()`` result to reuse across a batch of updates.
+    """
+    k = settings.ARTWORK_SIMILAR_COUNT
+    ids, eligible, matrix = loaded or _load()
+    index = {int(pk): i for i, pk in enumerate(ids)}
+    position = index.get(artwork.pk)
+
+    with transaction.atomic():
+        # Lists that held this artwork were scored against its old embedding or status
+        affected = set(SimilarArtwork.objects.filter(similar=artwork.pk).values_list('artwork_id', flat=True))
+        affected.discard(artwork.pk)
+        SimilarArtwork.objects.filter(
+            Q(artwork=artwork.pk) | Q(similar=artwork.pk) | Q(artwork__in=affected)
+        ).delete()
+
+        # Those lists are recomputed in full
+        links = []
+        for source in affected:
+            if source in index:
+                scores = matrix @ matrix[index[source]]
+                links += _links(source, _neighbours(scores, ids, eligible, source, k))
+
+        if position is not None:
+            scores = matrix @ matrix[position]
+            links += _links(artwork.pk, _neighbours(scores, ids, eligible, artwork.pk, k))
+
+            if eligible[position]:
+                # Offer it to every other list it now beats the weakest entry of
+                stats = {
+                    row['artwork']: (row['count'], row['weakest'])
+                    for row in SimilarArtwork.objects.exclude(artwork__in=affected)
+                    .values('artwork').annotate(count=Count('id'), weakest=Min('score'))
+                }
+                for i, source in enumerate(ids.tolist()):
+                    if source == artwork.pk or source in affected:
+                        continue
+                    count, weakest = stats.get(source, (0, None))
+                    if count < k or scores[i] > weakest:
+                        links.append(SimilarArtwork(artwork_id=source, similar_id=artwork.pk, score=float(scores[i])))
+                        if count >= k:
+                            SimilarArtwork.objects.filter(artwork=source).order_by('score', 'id').first().delete()
+
+        SimilarArtwork.objects.bulk_create(links, batch_size=1000)
+
+
+def mark_stale(artwork_ids):
+    # update() sends no signals, so this doesn't bump the catalog version
+    Artwork.objects.filter(pk__in=artwork_ids).update(similarity_stale=True)
+
+
+def withdraw(artwork):
+    """Drop ``artwork`` from every other list now; the lists are refilled by ``refresh_stale()``."""
+    links = SimilarArtwork.objects.filter(similar=artwork.pk)
+    mark_stale(list(links.values_list('artwork_id', flat=True)))
+    links.delete()
+
+
+def refresh_stale():
+    """Update the lists of every artwork flagged ``similarity_stale``. Returns how many there were."""
+    artwork_ids = list(Artwork.objects.filter(similarity_stale=True).values_list('id', flat=True))
+    if not artwork_ids:
+        return 0
+    # Cleared first, so a change made during the refresh flags the artwork again
+    Artwork.objects.filter(pk__in=artwork_ids).update(similarity_stale=False)
+    refresh(artwork_ids)
+    # Detail pages show the lists
+    bump_catalog_version()
+    return len(artwork_ids)
+
+
+def rebuild():
+    """Recompute every list. Returns the number of artworks indexed."""
+    k = settings.ARTWORK_SIMILAR_COUNT
+    Artwork.objects.filter(similarity_stale=True).update(similarity_stale=False)
+    ids, eligible, matrix = _load()
+    candidate_ids = ids[eligible]
+    candidates = matrix[eligible]
+    everyone = np.ones(len(candidate_ids), dtype=bool)
+
+    links = []
+    for start in range(0, len(ids), BLOCK_SIZE):
+        block = matrix[start:start + BLOCK_SIZE] @ candidates.T
+        for row, artwork_id in enumerate(ids[start:start + BLOCK_SIZE].tolist()):
+            links += _links(artwork_id, _neighbours(block[row], candidate_ids, everyone, artwork_id, k))
+
+    with transaction.atomic():
+        SimilarArtwork.objects.all().delete()
+        SimilarArtwork.objects.bulk_create(links, batch_size=1000)
+    return len(ids)
+
+
+def refresh(artwork_ids):
+    """Update the lists after ``artwork_ids`` changed, incrementally when there are few."""
+    artwork_ids = list(artwork_ids)
+    if len(artwork_ids) > REBUILD_THRESHOLD:
+        return rebuild()
+    # The lists change between updates, but the embeddings and statuses read here don't
+    loaded = _load()
+    for artwork in Artwork.objects.filter(pk__in=artwork_ids).only('id', 'status', 'embedding'):
+        update_neighbours(artwork, loaded)
+    return len(artwork_ids)
+
+
+def similar_artworks(artwork, limit):
+    """The ``limit`` most similar available artworks, best first (an index range scan)."""
+    return Artwork.objects.filter(similar_of__artwork=artwork).order_by('-similar_of__score')[:limit]
@@ -0,0 +1,72 @@
+var paypalContainer = document.getElementById('paypal-button-container');
+if (paypalContainer) paypal.Buttons({
+    createOrder: function(data, actions) {
+        return actions.order.create({
+            purchase_units: [{
+                amount: {
+                    value: paypalContainer.dataset.price
+                },
+                payee: {
+                    email_address: paypalContainer.dataset.payee
+                }
+            }]
+        });
+    },
+    onApprove: function(data, actions) {
+        return actions.order.capture().then(function(details) {
+            // Get form data
+            const form = document.getElementById('payment-form');
+            const formData = new FormData(form);
+
+            // Send success data to our backend
+            fetch(paypalContainer.dataset.successUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    artwork_id: paypalContainer.dataset.artwork,
+                    order_id: details.id,
+                    name: formData.get('name'),
+                    email: formData.get('email'),
+                    phone: formData.get('phone'),
+                    address: formData.get('address')
+                })
+            })
+            .then(response => {
+                if (response.ok) {
+                    // Redirect to success page
+                    window.location.href = response.url;
+                } else if (response.status === 409) {
+                    // Sold to someone else first
+                    return response.json().then(result => alert(result.message));
+                } else {
+                    throw new Error('Payment processing failed');
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                alert('There was an error processing your payment. Please contact us.');
+            });
+        });
+    }
+}).render('#paypal-button-container');
+
+document.addEventListener('DOMContentLoaded', function() {
+    var img = document.getElementById('main-artwork-image');
+    var modal = document.getElementById('fullResModal');
+    var closeBtn = document.getElementById('closeModal');
+    if (img && modal && closeBtn) {
+        img.addEventListener('click', function() {
+            modal.style.display = 'flex';
+        });
+        closeBtn.addEventListener('click', function() {
+            modal.style.display = 'none';
+        });
+        modal.addEventListener('click', function(e) {
+            if (e.target === modal) {
+                modal.style.display = 'none';
+            }
+        });
+    }
+});
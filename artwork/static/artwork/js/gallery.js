@@ -0,0 +1,166 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Initialize Masonry
+    var grid = document.querySelector('.grid');
+    var masonry = new Masonry(grid, {
+        itemSelector: '.grid-item',
+        columnWidth: '.grid-item',
+        percentPosition: true,
+        transitionDuration: '0.2s'
+    });
+
+    // Tiles carry their width/height, so only unsized images need a relayout once they load
+    function layoutUnsizedImages(container) {
+        var unsized = container.querySelectorAll('img:not([width])');
+        if (unsized.length) {
+            imagesLoaded(unsized).on('progress', function() {
+                masonry.layout();
+            });
+        }
+    }
+    layoutUnsizedImages(grid);
+
+    // Infinite Scroll
+    var loading = false;
+    // Opaque cursor link for the next page; empty once the end is reached
+    var nextPageUrl = grid.dataset.next;
+    var loadingIndicator = document.getElementById('loadingIndicator');
+
+    function loadMoreArtwork() {
+        if (loading || !nextPageUrl) return;
+        loading = true;
+        loadingIndicator.classList.add('active');
+
+        fetch(nextPageUrl)
+            .then(response => response.json())
+            .then(data => {
+                if (data.results && data.results.length > 0) {
+                    data.results.forEach(artwork => {
+                        var item = createArtworkElement(artwork);
+                        grid.appendChild(item);
+                        masonry.appended(item);
+                        layoutUnsizedImages(item);
+                    });
+                    masonry.layout();
+                }
+                nextPageUrl = data.next;
+                loading = false;
+                loadingIndicator.classList.remove('active');
+            })
+            .catch(error => {
+                console.error('Error loading more artwork:', error);
+                loading = false;
+                loadingIndicator.classList.remove('active');
+            });
+    }
+
+    function createArtworkElement(artwork) {
+        var div = document.createElement('div');
+        div.className = 'grid-item';
+        div.innerHTML = `
+            <a href="/artwork/${artwork.id}" class="artwork-card">
+                <div class="card">
+                    <div class="position-relative">
+                        <picture>
+                            ${(artwork.sources || []).map(s => `<source type="${s.type}" srcset="${s.srcset}" sizes="(max-width: 576px) 100vw, (max-width: 768px) 50vw, 20vw">`).join('')}
+                            <img src="${artwork.tile_image || artwork.image}"${artwork.srcset ? ` srcset="${artwork.srcset}" sizes="(max-width: 576px) 100vw, (max-width: 768px) 50vw, 20vw"` : ''}${artwork.tile_width ? ` width="${artwork.tile_width}" height="${artwork.tile_height}"` : ''}${artwork.placeholder ? ` style="background: ${artwork.dominant_color} url('${artwork.placeholder}') center / cover no-repeat"` : ''} class="card-img-top" alt="${artwork.title}" loading="lazy">
+                        </picture>
+                        <span class="badge ${artwork.status === 'FOR_SALE' ? 'bg-success' : artwork.status === 'SOLD' ? 'bg-danger' : 'bg-secondary'} status-badge">
+                            ${artwork.status}
+                        </span>
+                    </div>
+                    <div class="card-body">
+                        <h5 class="card-title">${artwork.title}</h5>
+                        <p class="card-text">${artwork.search_snippet || artwork.description}</p>
+                        <div class="d-flex gap-2 mb-3">
+                            <span class="badge bg-primary">${artwork.medium_display}</span>
+                            <span class="badge bg-secondary">${artwork.category_display}</span>
+                        </div>
+                        ${artwork.status === 'FOR_SALE' ? `
+                        <p class="card-text">
+                            <strong class="text-primary">£${artwork.price}</strong>
+                        </p>
+                        ` : ''}
+                    </div>
+                </div>
+            </a>
+        `;
+        return div;
+    }
+
+    // Intersection Observer for infinite scroll
+    var observer = new IntersectionObserver(function(entries) {
+        entries.forEach(function(entry) {
+            if (entry.isIntersecting) {
+                loadMoreArtwork();
+            }
+        });
+    });
+
+    observer.observe(loadingIndicator);
+
+    // Filter functionality
+    var statusFilter = document.getElementById('statusFilter');
+    var mediumFilter = document.getElementById('mediumFilter');
+    var categoryFilter = document.getElementById('categoryFilter');
+    var searchInput = document.getElementById('searchInput');
+
+    // Show how many artworks each option would return alongside the other filters
+    function updateFacetCounts(filters) {
+        fetch(`/api/facets/?${new URLSearchParams(filters)}`)
+            .then(response => response.json())
+            .then(counts => {
+                [['status', statusFilter], ['medium', mediumFilter], ['category', categoryFilter]].forEach(([facet, select]) => {
+                    select.querySelectorAll('option[data-label]').forEach(option => {
+                        option.textContent = `${option.dataset.label} (${counts[facet][option.value] ?? 0})`;
+                    });
+                });
+            })
+            .catch(error => console.error('Error fetching facet counts:', error));
+    }
+
+    function applyFilters() {
+        var filters = {
+            status: statusFilter.value,
+            medium: mediumFilter.value,
+            category: categoryFilter.value,
+            search: searchInput.value
+        };
+
+        updateFacetCounts(filters);
+        fetch(`/api/artwork/?${new URLSearchParams({...filters, fields: grid.dataset.fields})}`)
+            .then(response => response.json())
+            .then(data => {
+                // Clear existing items
+                while (grid.firstChild) {
+                    grid.removeChild(grid.firstChild);
+                }
+                // Continue from the filtered results
+                nextPageUrl = data.next;
+                // Add new items
+                data.results.forEach(artwork => {
+                    var item = createArtworkElement(artwork);
+                    grid.appendChild(item);
+                });
+                // Reinitialize Masonry
+                masonry.reloadItems();
+                masonry.layout();
+            });
+    }
+
+    statusFilter.addEventListener('change', applyFilters);
+    mediumFilter.addEventListener('change', applyFilters);
+    categoryFilter.addEventListener('change', applyFilters);
+    searchInput.addEventListener('input', debounce(applyFilters, 300));
+
+    function debounce(func, wait) {
+        var timeout;
+        return function() {
+            var context = this;
+            var args = arguments;
+            clearTimeout(timeout);
+            timeout = setTimeout(function() {
+                func.apply(context, args);
+            }, wait);
+        };
+    }
+});
@@ -0,0 +1,210 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Initialize Masonry
+    var grid = document.querySelector('.grid');
+    var masonry = new Masonry(grid, {
+        itemSelector: '.grid-item',
+        columnWidth: '.grid-item',
+        percentPosition: true,
+        transitionDuration: 0
+    });
+
+    // Track if layout is in progress
+    let isLayoutInProgress = false;
+
+    // Safe layout function with debounce
+    function safeLayout(grid) {
+        if (isLayoutInProgress) return;
+
+        isLayoutInProgress = true;
+        grid.layout();
+
+        // Reset flag after layout is complete
+        setTimeout(() => {
+            isLayoutInProgress = false;
+        }, 50);
+    }
+
+    // Tiles carry their width/height, so Masonry has already laid them out;
+    // only images without stored dimensions need a relayout once they load
+    function layoutUnsizedImages(container) {
+        var unsized = container.querySelectorAll('img:not([width])');
+        if (unsized.length) {
+            imagesLoaded(unsized).on('progress', function() {
+                safeLayout(masonry);
+            });
+        }
+    }
+    layoutUnsizedImages(grid);
+
+    // Also reinitialize on window resize
+    window.addEventListener('resize', function() {
+        safeLayout(masonry);
+    });
+
+    // Set default active buttons
+    const defaultButtons = {
+        'status': 'all',
+        'medium': 'all',
+        'category': 'all',
+        'sort': 'newest'
+    };
+
+    // Initialize default active states
+    Object.entries(defaultButtons).forEach(([group, value]) => {
+        const button = document.querySelector(`.filter-btn[data-group="${group}"][data-value="${value}"]`);
+        if (button) {
+            button.classList.add('active');
+        }
+    });
+
+    // Handle filter button clicks
+    document.querySelectorAll('.filter-btn').forEach(button => {
+        button.addEventListener('click', function() {
+            const group = this.dataset.group;
+            const value = this.dataset.value;
+
+            // Toggle active state for buttons in the same group
+            document.querySelectorAll(`.filter-btn[data-group="${group}"]`).forEach(btn => {
+                btn.classList.remove('active');
+            });
+            this.classList.add('active');
+
+            // Fetch filtered artwork
+            fetchFilteredArtwork();
+        });
+    });
+
+    async function fetchFilteredArtwork(nextUrl = null) {
+        const firstPage = !nextUrl;
+        const params = new URLSearchParams();
+
+        // Add active filters
+        document.querySelectorAll('.filter-btn.active').forEach(btn => {
+            const group = btn.dataset.group;
+            const value = btn.dataset.value;
+            if (value !== 'all') {
+                params.append(group, value);
+            }
+        });
+
+        try {
+            const grid = document.getElementById('latestGrid');
+            const loadingIndicator = document.getElementById('loadingIndicator');
+
+            // Show loading indicator
+            loadingIndicator.style.display = 'block';
+
+            // Fade out grid on first page load
+            if (firstPage) {
+                updateFacetCounts(params);
+                grid.style.opacity = '0';
+                await new Promise(resolve => setTimeout(resolve, 300));
+            }
+
+            // Later pages follow the API's opaque cursor links
+            const response = await fetch(nextUrl || `/api/artwork/?${params.toString()}&fields=${grid.dataset.fields}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const data = await response.json();
+
+            // Clear existing content only on first page
+            if (firstPage) {
+                grid.innerHTML = '';
+            }
+
+            // Add new artwork
+            data.results.forEach(artwork => {
+                const card = createArtworkCard(artwork);
+                grid.appendChild(card);
+            });
+
+            // Reinitialize Masonry straight away; sized tiles don't need to load first
+            masonry.reloadItems();
+            safeLayout(masonry);
+            layoutUnsizedImages(grid);
+
+            // Fade in grid
+            grid.style.opacity = '1';
+
+            // Hide loading indicator
+            loadingIndicator.style.display = 'none';
+
+            // Store next page URL if available
+            if (data.next) {
+                window.nextPageUrl = data.next;
+            } else {
+                window.nextPageUrl = null;
+            }
+        } catch (error) {
+            console.error('Error fetching artwork:', error);
+            loadingIndicator.style.display = 'none';
+        }
+    }
+
+    // Show how many artworks each filter option would return
+    async function updateFacetCounts(params) {
+        try {
+            const response = await fetch(`/api/facets/?${params.toString()}`);
+            if (!response.ok) return;
+            const counts = await response.json();
+            document.querySelectorAll('.facet-count').forEach(span => {
+                span.textContent = counts[span.dataset.facet][span.dataset.value] ?? 0;
+            });
+        } catch (error) {
+            console.error('Error fetching facet counts:', error);
+        }
+    }
+
+    function createArtworkCard(artwork) {
+        const div = document.createElement('div');
+        div.className = 'grid-item latest';
+        div.innerHTML = `
+            <a href="/artwork/${artwork.id}" class="artwork-card">
+                <div class="card">
+                    <div class="position-relative">
+                        <picture>
+                            ${(artwork.sources || []).map(s => `<source type="${s.type}" srcset="${s.srcset}" sizes="(max-width: 768px) 50vw, 15vw">`).join('')}
+                            <img src="${artwork.tile_image || artwork.image}"${artwork.srcset ? ` srcset="${artwork.srcset}" sizes="(max-width: 768px) 50vw, 15vw"` : ''}${artwork.tile_width ? ` width="${artwork.tile_width}" height="${artwork.tile_height}"` : ''}${artwork.placeholder ? ` style="background: ${artwork.dominant_color} url('${artwork.placeholder}') center / cover no-repeat"` : ''} class="card-img-top" alt="${artwork.title}" loading="lazy">
+                        </picture>
+                        <span class="badge ${artwork.status === 'FOR_SALE' ? 'bg-success' : artwork.status === 'SOLD' ? 'bg-danger' : 'bg-secondary'} status-badge">
+                            ${artwork.status_display}
+                        </span>
+                    </div>
+                    <div class="card-body">
+                        <h5 class="card-title">${artwork.title}</h5>
+                        <p class="card-text">${artwork.description}</p>
+                        <div class="d-flex justify-content-center gap-2 mb-3">
+                            <span class="badge bg-primary">${artwork.medium_display}</span>
+                            <span class="badge bg-secondary">${artwork.category_display}</span>
+                        </div>
+                        ${artwork.status === 'FOR_SALE' ? `
+                            <p class="card-text">
+                                <strong class="text-primary">£${artwork.price}</strong>
+                            </p>
+                        ` : ''}
+                    </div>
+                </div>
+            </a>
+        `;
+        return div;
+    }
+
+    // Add scroll event listener for infinite scroll
+    let isLoading = false;
+    window.addEventListener('scroll', async () => {
+        if (isLoading || !window.nextPageUrl) return;
+
+        const scrollPosition = window.innerHeight + window.scrollY;
+        const documentHeight = document.documentElement.scrollHeight;
+
+        if (scrollPosition >= documentHeight - 1000) {
+            isLoading = true;
+            await fetchFilteredArtwork(window.nextPageUrl);
+            isLoading = false;
+        }
+    });
+
+    // Initial fetch with default filters
+    fetchFilteredArtwork();
+});
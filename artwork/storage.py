@@ -0,0 +1,71 @@
+"""Static files storage: minified, fingerprinted and precompressed by ``collectstatic``.
+
+CSS and JS are minified before ``ManifestStaticFilesStorage`` hashes them,
+so the hash in each filename covers the bytes actually served. Each hashed
+text asset then gets ``.gz`` and, with the ``brotli`` package installed,
+``.br`` siblings for nginx's ``gzip_static``/``brotli_static``; hashed names
+never change content, so they can be cached as immutable.
+"""
+import gzip
+import rcssmin
+import rjsmin
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+MINIFIERS = {
+    '.css': rcssmin.cssmin,
+    '.js': rjsmin.jsmin,
+}
+
+COMPRESSIBLE = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.ttf', '.otf', '.eot', '.ico')
+
+# Smaller files fit in a packet anyway
+MIN_COMPRESS_BYTES = 512
+
+
+def _extension(name):
+    return name[name.rfind('.'):].lower() if '.' in name else ''
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = {path: self._minify(path, storage, source) for path, (storage, source) in paths.items()}
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            for hashed_name in set(self.hashed_files.values()):
+                self._compress(hashed_name)
+
+    def _minify(self, path, storage, source):
+        """``(storage, path)`` to hash ``path`` from: the minified copy collected here, if minifiable."""
+        minify = MINIFIERS.get(_extension(path))
+        if minify is None or '.min.' in path:
+            return storage, source
+        with storage.open(source) as original:
+            content = original.read().decode('utf-8')
+        if self.exists(path):
+            self.delete(path)
+        self._save(path, ContentFile(minify(content).encode('utf-8')))
+        return self, path
+
+    def _compress(self, name):
+        if not name.lower().endswith(COMPRESSIBLE):
+            return
+        with self.open(name) as f:
+            content = f.read()
+        if len(content) < MIN_COMPRESS_BYTES:
+            return
+        encoders = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append(('.br', lambda data: brotli.compress(data, quality=11)))
+        for suffix, encode in encoders:
+            compressed = encode(content)
+            if len(compressed) < len(content):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
@@ -0,0 +1,259 @@
+import io
+import json
+import tempfile
+import threading
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image
+from . import views
+from .benchmarks import seed_artworks
+from .derivatives import render_artwork, render_artwork_fields
+from .management.commands.regenerate_derivatives import Command as RegenerateDerivatives
+from .models import Artwork, Checkout, DerivativeJob, OutboundEmail
+from .query_plans import analyze, explain, hot_queries
+
+# Per-process caches, so tests never bump the real site's version stamps
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'test-{alias}'}
+    for alias in ('default', 'versions')
+}
+
+
+def new_artwork(title, **fields):
+    return Artwork.objects.create(
+        title=title, description='Test artwork', status='FOR_SALE', price=100, medium='OIL',
+        category='PORTRAIT', **fields,
+    )
+
+
+def sample_image(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (900, 1200), color).save(buffer, 'JPEG')
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ImageReplacementTests(TestCase):
+    """Replacing an artwork's image rebuilds every derivative from the new file."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.artwork = Artwork(title='Replaced', description='Image replacement', status='FOR_SALE', price=100,
+                               medium='OIL', category='PORTRAIT')
+        self.artwork.image.save('replace-red.jpg', sample_image('#c03030'), save=False)
+        self.artwork.save()
+        self.run_jobs()
+        self.before = self.snapshot()
+
+    def run_jobs(self):
+        """Run due jobs in this process, as the process_derivatives worker would."""
+        for job in DerivativeJob.claim(100):
+            _, duration_ms, error = render_artwork(job.artwork_id)
+            self.assertEqual(error, '')
+            job.mark_done(duration_ms)
+
+    def snapshot(self):
+        self.artwork.refresh_from_db()
+        return {field: getattr(self.artwork, field) for field in Artwork.DERIVATIVE_FIELDS}
+
+    def replace_image(self, name, color):
+        artwork = Artwork.objects.get(pk=self.artwork.pk)
+        artwork.image.save(name, sample_image(color), save=False)
+        artwork.save()
+        return artwork
+
+    def assertRebuilt(self):
+        old, new = self.before, self.snapshot()
+        self.assertTrue(new['image_hash'])
+        self.assertNotEqual(new['image_hash'], old['image_hash'])
+        names = {r['name'] for entries in new['renditions'].values() for r in entries}
+        old_names = {r['name'] for entries in old['renditions'].values() for r in entries}
+        self.assertTrue(names)
+        self.assertFalse(names & old_names, 'renditions must get new content-addressed names')
+        self.assertNotEqual(new['tile_image'], old['tile_image'])
+        self.assertNotEqual(new['thumbnail_image'], old['thumbnail_image'])
+        self.assertNotEqual(new['dominant_color'], old['dominant_color'])
+        self.assertNotEqual(new['embedding'], old['embedding'])
+
+    def test_save_without_new_image_keeps_derivatives(self):
+        artwork = Artwork.objects.get(pk=self.artwork.pk)
+        artwork.title = 'Renamed'
+        artwork.save()
+        self.assertFalse(DerivativeJob.objects.filter(status='PENDING').exists())
+        self.assertEqual(self.snapshot(), self.before)
+
+    def test_replacement_rebuilds_derivatives(self):
+        self.replace_image('replace-blue.jpg', '#3030c0')
+        self.assertTrue(DerivativeJob.objects.filter(artwork=self.artwork, status='PENDING').exists())
+        self.artwork.refresh_from_db()
+        self.assertFalse(self.artwork.image_hash)
+        self.assertFalse(self.artwork.renditions)
+        self.run_jobs()
+        self.assertRebuilt()
+
+    def test_replacement_while_old_image_renders(self):
+        Artwork.objects.filter(pk=self.artwork.pk).update(image_hash='')
+        DerivativeJob.enqueue(self.artwork)
+        [job] = DerivativeJob.claim(1)
+        rendering = Artwork.objects.get(pk=self.artwork.pk)  # what the worker loaded
+        replaced = self.replace_image('replace-green.jpg', '#30c030')
+        self.assertFalse(rendering.generate_derivatives(), 'a render of the old image must be discarded')
+        job.mark_done(0)
+        self.assertTrue(DerivativeJob.objects.filter(artwork=self.artwork, status='PENDING').exists(),
+                        'a job is queued again once the running one finishes')
+        self.run_jobs()
+        self.assertRebuilt()
+        self.assertEqual(self.artwork.image.name, replaced.image.name)
+
+    def test_regenerate_skips_replaced_image(self):
+        checkpoint = tempfile.NamedTemporaryFile(suffix='.json')
+        self.addCleanup(checkpoint.close)
+        command = RegenerateDerivatives()
+        command.replaced = 0
+        artwork_id, image, fields, _, error = render_artwork_fields(self.artwork.pk)
+        self.assertEqual(error, '')
+        self.replace_image('replace-blue.jpg', '#3030c0')
+        done = set()
+        command.flush([(artwork_id, image, fields)], done, checkpoint.name, 'run')
+        self.assertEqual(command.replaced, 1)
+        self.assertEqual(done, {artwork_id})
+        self.artwork.refresh_from_db()
+        self.assertFalse(self.artwork.image_hash, "the old image's derivatives must not be written")
+
+        artwork_id, image, fields, _, error = render_artwork_fields(self.artwork.pk)
+        command.flush([(artwork_id, image, fields)], done, checkpoint.name, 'run')
+        self.assertEqual(command.replaced, 1)
+        self.assertRebuilt()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class DerivativeJobTests(TestCase):
+    def test_enqueue_keeps_one_open_job(self):
+        artwork = new_artwork('Queued')
+        DerivativeJob.objects.all().delete()
+        self.assertIsNotNone(DerivativeJob.enqueue(artwork))
+        self.assertIsNone(DerivativeJob.enqueue(artwork))
+        self.assertEqual(DerivativeJob.objects.filter(artwork=artwork).count(), 1)
+
+    def test_enqueue_without_partial_indexes(self):
+        # The MySQL path, which locks the artwork's row instead of relying on the constraint
+        artwork = new_artwork('Queued')
+        DerivativeJob.objects.all().delete()
+        with mock.patch.object(connection.features, 'supports_partial_indexes', False):
+            self.assertIsNotNone(DerivativeJob.enqueue(artwork))
+            self.assertIsNone(DerivativeJob.enqueue(artwork))
+        self.assertEqual(DerivativeJob.objects.filter(artwork=artwork).count(), 1)
+
+
+class QueryPlanTests(TestCase):
+    """No hot catalog query falls back to a full scan plus sort."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Enough rows that the planner prefers an index when one fits
+        seed_artworks(5000)
+        analyze()
+
+    def test_hot_queries_use_an_index(self):
+        for name, queryset in hot_queries():
+            with self.subTest(name):
+                plan, problems = explain(queryset)
+                self.assertEqual(problems, [], f'{queryset.query}\n{plan}')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CheckoutRaceTests(TransactionTestCase):
+    """Parallel PayPal callbacks sell an artwork exactly once, with one set of emails per order."""
+
+    CALLBACKS = 16
+
+    def callback(self, artwork, order_id, email, **payer):
+        request = RequestFactory().post('/payment/success/', data=json.dumps({
+            'artwork_id': artwork.pk,
+            'order_id': order_id,
+            'name': 'Race Tester',
+            'email': email,
+            'phone': '0123',
+            'address': '1 Test Street',
+            **payer,
+        }), content_type='application/json', HTTP_HOST='localhost')
+        return views.payment_success(request)
+
+    def race(self, calls):
+        """Run ``calls`` at the same moment on their own threads; returns the status codes."""
+        barrier = threading.Barrier(len(calls))
+        statuses = [None] * len(calls)
+
+        def run(i, call):
+            try:
+                barrier.wait()
+                statuses[i] = call().status_code
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_retries_of_one_order(self):
+        artwork = new_artwork('Retried')
+        statuses = self.race([lambda: self.callback(artwork, 'ORDER-RETRY', 'buyer@example.com')] * self.CALLBACKS)
+        artwork.refresh_from_db()
+        self.assertEqual(statuses, [200] * self.CALLBACKS)
+        self.assertEqual(artwork.status, 'SOLD')
+        self.assertEqual(Checkout.objects.filter(order_id='ORDER-RETRY').count(), 1)
+        # Customer and artist
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    def test_different_orders_for_one_artwork(self):
+        n = self.CALLBACKS
+        artwork = new_artwork('Contested')
+        statuses = self.race([
+            (lambda i=i: self.callback(artwork, f'ORDER-{i}', f'buyer{i}@example.com')) for i in range(n)
+        ])
+        artwork.refresh_from_db()
+        self.assertEqual(statuses.count(200), 1)
+        self.assertEqual(statuses.count(409), n - 1)
+        self.assertEqual(artwork.status, 'SOLD')
+        outcomes = list(artwork.checkouts.values_list('outcome', flat=True))
+        self.assertEqual(len(outcomes), n)
+        self.assertEqual(outcomes.count('SOLD'), 1)
+        # Two for the sale, one refund notice per other order
+        self.assertEqual(OutboundEmail.objects.count(), 2 + (n - 1))
+
+        winner = artwork.checkouts.get(outcome='SOLD')
+        emails = OutboundEmail.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.callback(artwork, winner.order_id, winner.customer_email)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(OutboundEmail.objects.count(), emails)
+        writes = [q['sql'] for q in queries.captured_queries if not q['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertEqual(writes, [], 'a duplicate callback must not write')
+
+    def test_overlong_payer_details(self):
+        artwork = new_artwork('Overlong')
+        response = self.callback(artwork, 'ORDER-LONG', 'long@example.com', name='N' * 500,
+                                 phone='+44 ' * 40, address='Flat 1\n' * 2000)
+        self.assertEqual(response.status_code, 200)
+        checkout = Checkout.objects.get(order_id='ORDER-LONG')
+        for field in Checkout._meta.fields:
+            if field.name.startswith('customer_'):
+                self.assertLessEqual(len(getattr(checkout, field.name)),
+                                     field.max_length or Checkout.MAX_ADDRESS_LENGTH, field.name)
+
+        # No order ID and a long email: the fallback ID must still fit; phone and address are optional
+        response = self.callback(artwork, None, 'x' * 200 + '@example.com', phone=None, address=None)
+        self.assertEqual(response.status_code, 409)
+        fallback = Checkout.objects.get(artwork=artwork, order_id__startswith='artwork-')
+        self.assertLessEqual(len(fallback.order_id), Checkout._meta.get_field('order_id').max_length)
@@ -0,0 +1,64 @@
+"""Size-limited upload handling for model application photos.
+
+Every file is streamed to a temporary file on disk as it arrives, never held
+in memory, and counted against a per-file and a per-request limit. A file
+over its limit is skipped; a request over its limit stops the upload. The
+view reports both from the handler.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, StopUpload, TemporaryFileUploadHandler
+from .imaging import image_size
+
+
+class QuotaUploadHandler(TemporaryFileUploadHandler):
+    def __init__(self, request=None, max_file_bytes=None, max_request_bytes=None):
+        super().__init__(request)
+        self.max_file_bytes = max_file_bytes or settings.MODEL_IMAGE_MAX_FILE_BYTES
+        self.max_request_bytes = max_request_bytes or settings.MODEL_IMAGE_MAX_REQUEST_BYTES
+        self.received = 0
+        self.rejected = []
+        self.stopped = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file_bytes = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file_bytes += len(raw_data)
+        self.received += len(raw_data)
+        if self.received > self.max_request_bytes:
+            self.stopped = True
+            # Read and discard the rest so the client gets the error page
+            raise StopUpload(connection_reset=False)
+        if self.file_bytes > self.max_file_bytes:
+            self.rejected.append(self.file_name)
+            raise SkipFile
+        return super().receive_data_chunk(raw_data, start)
+
+
+def limit_uploads(request):
+    """Install a ``QuotaUploadHandler`` on ``request`` and return it.
+
+    Must run before anything reads the body, CSRF checks included.
+    """
+    handler = QuotaUploadHandler(request)
+    request.upload_handlers = [handler]
+    return handler
+
+
+def limits():
+    return {
+        'file_mb': settings.MODEL_IMAGE_MAX_FILE_BYTES // (1024 * 1024),
+        'request_mb': settings.MODEL_IMAGE_MAX_REQUEST_BYTES // (1024 * 1024),
+    }
+
+
+def unreadable(files):
+    """Names of the uploaded ``files`` that are not images Pillow can open."""
+    names = []
+    for upload in files:
+        try:
+            image_size(upload)
+        except Exception:
+            names.append(upload.name)
+    return names
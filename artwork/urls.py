@@ -1,16 +1,26 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'artwork', views.ArtworkViewSet)
 router.register(r'commissions', views.CommissionRequestViewSet)
 
+pages = async_views if settings.ARTWORK_ASYNC_VIEWS else views
+
 urlpatterns = [
+    path('facets/', views.facets, name='facets'),
+]
+if settings.ARTWORK_ASYNC_VIEWS:
+    # Ahead of the router, which still serves the rest of the artwork API
+    urlpatterns.append(path('artwork/', async_views.artwork_list, name='artwork-list'))
+
+urlpatterns += [
     path('', include(router.urls)),
-    path('', views.home, name='home'),
-    path('gallery/', views.gallery, name='gallery'),
-    path('commission/', views.commission, name='commission'),
-    path('artwork/<int:artwork_id>/', views.artwork_detail, name='artwork_detail'),
-    path('payment/success/', views.payment_success, name='payment_success'),
-] 
\ No newline at end of file
+    path('', pages.home, name='home'),
+    path('gallery/', pages.gallery, name='gallery'),
+    path('commission/', pages.commission, name='commission'),
+    path('artwork/<int:artwork_id>/', pages.artwork_detail, name='artwork_detail'),
+    path('payment/success/', pages.payment_success, name='payment_success'),
+]
\ No newline at end of file
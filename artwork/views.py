@@ -1,37 +1,42 @@
 from django.shortcuts import render
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
-from django.core.paginator import Paginator
 from django.db.models import Q, Case, When, F, FloatField, Value
-from django.core.mail import send_mail
+from django.db import transaction
 from django.conf import settings
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 import json
-from .models import Artwork, CommissionRequest, PayPalAccount, ModelApplication, ModelImage
-from .serializers import ArtworkSerializer, CommissionRequestSerializer
+from . import resize_cache, search
+from .conditional import conditional_catalog
+from .page_cache import cache_catalog_page
+from .uploads import limit_uploads, limits as upload_limits, unreadable
+from .facets import facet_counts, selection_from
+from .similarity import similar_artworks as similar_artworks_for
+from .pagination import CatalogPagination, InvalidCursor, catalog_page, keyset_columns
+from .imaging import FORMATS, available_formats
+from .models import Artwork, Checkout, CommissionRequest, DerivativeJob, PayPalAccount, ModelApplication, ModelImage, OutboundEmail
+from .serializers import CARD_FIELDS, ArtworkSerializer, ArtworkValuesSerializer, CommissionRequestSerializer
 from rest_framework import viewsets, filters, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from django.shortcuts import render, get_object_or_404
-from rest_framework.pagination import PageNumberPagination
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 1000
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
 
 # API Views
+@method_decorator(conditional_catalog, name='list')
+@method_decorator(conditional_catalog, name='retrieve')
 class ArtworkViewSet(viewsets.ModelViewSet):
     queryset = Artwork.objects.all()
     serializer_class = ArtworkSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, search.FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'medium', 'category']
-    search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'price']
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CatalogPagination
 
     def get_queryset(self):
         queryset = Artwork.objects.all()
@@ -51,32 +56,46 @@ class ArtworkViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(category=category)
         
         # Apply sorting
-        if sort == 'newest':
-            queryset = queryset.order_by('-created_at')
-        elif sort == 'oldest':
-            queryset = queryset.order_by('created_at')
-        elif sort == 'price_high':
-            # When sorting by price, exclude NOT_AVAILABLE items
-            queryset = queryset.exclude(status='NOT_AVAILABLE').order_by('-price', '-created_at')
-        elif sort == 'price_low':
+        if sort in ('price_high', 'price_low'):
             # When sorting by price, exclude NOT_AVAILABLE items
-            queryset = queryset.exclude(status='NOT_AVAILABLE').order_by('price', '-created_at')
+            queryset = queryset.exclude(status='NOT_AVAILABLE')
+        if sort in Artwork.SORT_ORDERINGS:
+            queryset = queryset.order_by(*Artwork.SORT_ORDERINGS[sort])
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Lists render .values() rows of just the requested ?fields= instead of model instances
+        serializer = ArtworkValuesSerializer(request.query_params.get('fields'), self.get_serializer_context())
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = serializer.values(queryset, *keyset_columns(queryset))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(queryset))
+
+@conditional_catalog
+@api_view(['GET'])
+def facets(request):
+    """Per-option artwork counts for the filter UI, given the current selection."""
+    params = request.query_params
+    return Response(facet_counts(selection_from(params), params.get('search')))
+
 class CommissionRequestViewSet(viewsets.ModelViewSet):
     queryset = CommissionRequest.objects.all().order_by('-created_at')
     serializer_class = CommissionRequestSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, search.FullTextSearchFilter]
     filterset_fields = ['status', 'medium', 'category']
-    search_fields = ['name', 'description']
 
 # Template Views
-def home(request):
+# The query building is shared with the async versions in async_views
+
+def home_artworks(params):
+    """Featured and latest artwork querysets for the home page filters in ``params``."""
     # Get filter parameters
-    status = request.GET.getlist('status')
-    medium = request.GET.getlist('medium')
-    category = request.GET.getlist('category')
+    status = params.getlist('status')
+    medium = params.getlist('medium')
+    category = params.getlist('category')
     
     # Base queryset
     featured_artworks = Artwork.objects.filter(status='FOR_SALE').order_by('-price')[:3]
@@ -111,23 +130,27 @@ def home(request):
         latest_artworks = latest_artworks.filter(conditions)
     
     # Limit to 25 items
-    latest_artworks = latest_artworks[:25]
-    
-    # Serialize the data
-    featured_serializer = ArtworkSerializer(featured_artworks, many=True)
-    latest_serializer = ArtworkSerializer(latest_artworks, many=True)
-    
-    return render(request, 'home.html', {
+    return featured_artworks, latest_artworks[:25]
+
+def home_context(params, featured_artworks, latest_artworks, counts):
+    return {
         'featured_artworks': featured_artworks,
         'latest_artworks': latest_artworks,
-        'featured_json': featured_serializer.data,
-        'latest_json': latest_serializer.data,
+        'card_fields': ','.join(CARD_FIELDS),
+        'facet_counts': counts,
         'current_filters': {
-            'status': status,
-            'medium': medium,
-            'category': category
+            'status': params.getlist('status'),
+            'medium': params.getlist('medium'),
+            'category': params.getlist('category')
         }
-    })
+    }
+
+@conditional_catalog
+@cache_catalog_page
+def home(request):
+    featured_artworks, latest_artworks = home_artworks(request.GET)
+    counts = facet_counts(selection_from(request.GET))
+    return render(request, 'home.html', home_context(request.GET, featured_artworks, latest_artworks, counts))
 
 def commission(request):
     if request.method == 'POST':
@@ -135,30 +158,37 @@ def commission(request):
         pass
     return render(request, 'commission.html')
 
+def similar_to(artwork):
+    # Nearest neighbours precomputed from the image embeddings
+    similar_artworks = list(similar_artworks_for(artwork, 3))
+    if not similar_artworks:
+        # Not indexed yet: fall back to the newest artworks with the same medium and category
+        similar_artworks = list(Artwork.objects.filter(
+            medium=artwork.medium,
+            category=artwork.category
+        ).exclude(
+            id=artwork.id  # Exclude the current artwork
+        ).exclude(status='NOT_AVAILABLE').order_by('-created_at')[:3])
+    return similar_artworks
+
+@conditional_catalog
+@cache_catalog_page
 def artwork_detail(request, artwork_id):
     artwork = get_object_or_404(Artwork, id=artwork_id)
     paypal_account = PayPalAccount.get_active_account()
     
-    # Find similar artworks based on matching both medium and category
-    similar_artworks = Artwork.objects.filter(
-        medium=artwork.medium,
-        category=artwork.category
-    ).exclude(
-        id=artwork.id  # Exclude the current artwork
-    ).order_by('?')[:3]  # Get 3 random matching artworks
-    
     return render(request, 'artwork_detail.html', {
         'artwork': artwork,
         'paypal_account': paypal_account,
-        'similar_artworks': similar_artworks
+        'similar_artworks': similar_to(artwork)
     })
 
-def gallery(request):
+def gallery_artworks(params):
     # Get filter parameters
-    status = request.GET.get('status')
-    medium = request.GET.get('medium')
-    category = request.GET.get('category')
-    search = request.GET.get('search')
+    status = params.get('status')
+    medium = params.get('medium')
+    category = params.get('category')
+    search_query = params.get('search')
     
     # Base queryset
     artworks = Artwork.objects.all()
@@ -170,26 +200,53 @@ def gallery(request):
         artworks = artworks.filter(medium=medium)
     if category:
         artworks = artworks.filter(category=category)
-    if search:
-        artworks = artworks.filter(Q(title__icontains=search) | Q(description__icontains=search))
     
-    # Order by newest first
-    artworks = artworks.order_by('-created_at')
-    
-    # Pagination
-    paginator = Paginator(artworks, 20)  # Show 20 artworks per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Order by newest first; a search ranks by relevance, newest breaking ties
+    artworks = artworks.order_by(*Artwork.SORT_ORDERINGS['newest'])
+    if search_query:
+        artworks = search.search(artworks, search_query)
+    return artworks
+
+def gallery_page(artworks, params):
+    """One page of ``artworks`` and the API URL infinite scroll continues from."""
+    search_query = params.get('search')
     
-    return render(request, 'gallery.html', {
-        'page_obj': page_obj,
+    # Pagination: keyset pages of 20, so deep scrolling costs the same as the first page
+    try:
+        page, next_params = catalog_page(artworks, params, 20)
+    except InvalidCursor:
+        raise Http404('Invalid cursor')
+    if search_query:
+        for artwork in page:
+            artwork.search_excerpt = search.snippet(artwork, search_query)
+
+    # Infinite scroll continues from the API with the same filters
+    next_page_url = None
+    if next_params:
+        query = {key: value for key, value in params.items() if key not in ('cursor', 'page') and value}
+        next_page_url = reverse('artwork-list') + '?' + urlencode({**query, 'fields': ','.join(CARD_FIELDS), **next_params})
+    return page, next_page_url
+
+def gallery_context(params, page, next_page_url, counts):
+    return {
+        'artworks': page,
+        'next_page_url': next_page_url,
+        'card_fields': ','.join(CARD_FIELDS),
+        'facet_counts': counts,
         'current_filters': {
-            'status': status,
-            'medium': medium,
-            'category': category,
-            'search': search
+            'status': params.get('status'),
+            'medium': params.get('medium'),
+            'category': params.get('category'),
+            'search': params.get('search')
         }
-    })
+    }
+
+@conditional_catalog
+@cache_catalog_page
+def gallery(request):
+    page, next_page_url = gallery_page(gallery_artworks(request.GET), request.GET)
+    counts = facet_counts(selection_from(request.GET), request.GET.get('search'))
+    return render(request, 'gallery.html', gallery_context(request.GET, page, next_page_url, counts))
 
 @csrf_exempt
 def payment_success(request):
@@ -198,49 +255,27 @@ def payment_success(request):
             data = json.loads(request.body)
             artwork = Artwork.objects.get(id=data['artwork_id'])
             
-            # Mark artwork as sold
-            artwork.status = 'SOLD'
-            artwork.save()
-            
-            # Prepare email content
-            context = {
-                'artwork': artwork,
+            # The PayPal order ID makes retried and duplicate callbacks idempotent;
+            # pages rendered before it was sent fall back to the buyer and artwork
+            order_id = data.get('order_id') or f"artwork-{artwork.id}-{data['email'].lower()}"
+            checkout, _ = Checkout.process(order_id, artwork, {
                 'customer_name': data['name'],
                 'customer_email': data['email'],
-                'customer_phone': data['phone'],
-                'customer_address': data['address'],
-            }
-            
-            # Render email templates
-            html_message = render_to_string('emails/purchase_confirmation.html', context)
-            plain_message = strip_tags(html_message)
-            
-            # Send confirmation email to customer
-            send_mail(
-                subject=f'Purchase Confirmation - {artwork.title}',
-                message=plain_message,
-                from_email='noreply@yourdomain.com',  # Update this with your email
-                recipient_list=[data['email']],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            
-            # Send notification email to artist
-            artist_message = render_to_string('emails/artist_notification.html', context)
-            artist_plain_message = strip_tags(artist_message)
+                'customer_phone': data.get('phone'),
+                'customer_address': data.get('address'),
+            })
             
-            send_mail(
-                subject=f'New Artwork Purchase - {artwork.title}',
-                message=artist_plain_message,
-                from_email='noreply@yourdomain.com',  # Update this with your email
-                recipient_list=['aboydmobile@gmail.com'],  # Update this with your email
-                html_message=artist_message,
-                fail_silently=False,
-            )
+            if checkout.artwork_id != artwork.id:
+                return JsonResponse({'status': 'error', 'message': 'This order is for a different artwork'}, status=409)
+            if checkout.outcome == 'UNAVAILABLE':
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Sorry, this artwork has already been sold. Your payment will be refunded.'
+                }, status=409)
             
             return render(request, 'payment_success.html', {
                 'artwork': artwork,
-                'customer_name': data['name']
+                'customer_name': checkout.customer_name
             })
             
         except Exception as e:
@@ -248,61 +283,92 @@ def payment_success(request):
     
     return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
 
+@csrf_exempt
 def models(request):
+    # Uploads stream to disk under size limits; the handler has to be in place
+    # before the CSRF check reads the body, so CSRF is checked in _models()
+    upload = limit_uploads(request) if request.method == 'POST' else None
+    return _models(request, upload)
+
+@csrf_protect
+def _models(request, upload):
+    context = {'upload_limits': upload_limits()}
     if request.method == 'POST':
+        images = request.FILES.getlist('images')
+        limits = context['upload_limits']
+        invalid = unreadable(images)
+        if upload.stopped:
+            context['error'] = f"Please keep your photos under {limits['request_mb']} MB in total."
+        elif upload.rejected:
+            context['error'] = f"Please keep each photo under {limits['file_mb']} MB (too large: {', '.join(upload.rejected)})."
+        elif invalid:
+            context['error'] = f"Please upload photos as JPEG, PNG or similar (unreadable: {', '.join(invalid)})."
+        if 'error' in context:
+            return render(request, 'models.html', context)
         try:
-            # Create the model application
-            application = ModelApplication.objects.create(
-                name=request.POST['name'],
-                email=request.POST['email'],
-                phone=request.POST.get('phone', ''),
-                modeling_type=request.POST['modeling_type'],
-                description=request.POST['description'],
-                availability=request.POST['availability'],
-                additional_info=request.POST.get('additional_info', '')
-            )
-
-            # Handle multiple image uploads
-            images = request.FILES.getlist('images')
-            for image in images:
-                ModelImage.objects.create(
-                    application=application,
-                    image=image
+            with transaction.atomic():
+                # Create the model application
+                application = ModelApplication.objects.create(
+                    name=request.POST['name'],
+                    email=request.POST['email'],
+                    phone=request.POST.get('phone', ''),
+                    modeling_type=request.POST['modeling_type'],
+                    description=request.POST['description'],
+                    availability=request.POST['availability'],
+                    additional_info=request.POST.get('additional_info', '')
                 )
 
-            # Send confirmation email to applicant
-            context = {
-                'name': application.name,
-                'modeling_type': application.get_modeling_type_display()
-            }
-            
-            html_message = render_to_string('emails/model_application_confirmation.html', context)
-            plain_message = strip_tags(html_message)
-            
-            send_mail(
-                subject='Model Application Received',
-                message=plain_message,
-                from_email='noreply@yourdomain.com',  # Update this with your email
-                recipient_list=[application.email],
-                html_message=html_message,
-                fail_silently=False,
-            )
+                # Store the photos in one insert; review thumbnails are rendered by process_derivatives
+                ModelImage.objects.bulk_create([ModelImage(application=application, image=image) for image in images])
+                DerivativeJob.enqueue_model_images(application.images.all())
+                # Queue the emails with the application; send_outbox delivers them
+                email_context = {
+                    'name': application.name,
+                    'modeling_type': application.get_modeling_type_display()
+                }
+                
+                # Confirmation email to applicant
+                OutboundEmail.queue(
+                    subject='Model Application Received',
+                    template='emails/model_application_confirmation.html',
+                    context=email_context,
+                    to=[application.email],
+                    from_email='noreply@yourdomain.com',  # Update this with your email
+                )
 
-            # Send notification email to artist
-            artist_message = render_to_string('emails/model_application_notification.html', context)
-            artist_plain_message = strip_tags(artist_message)
-            
-            send_mail(
-                subject='New Model Application Received',
-                message=artist_plain_message,
-                from_email='noreply@yourdomain.com',  # Update this with your email
-                recipient_list=['aboydmobile@gmail.com'],  # Update this with your email
-                html_message=artist_message,
-                fail_silently=False,
-            )
+                # Notification email to artist
+                OutboundEmail.queue(
+                    subject='New Model Application Received',
+                    template='emails/model_application_notification.html',
+                    context=email_context,
+                    to=['aboydmobile@gmail.com'],  # Update this with your email
+                    from_email='noreply@yourdomain.com',  # Update this with your email
+                )
 
-            return render(request, 'models.html', {'success': True})
+            return render(request, 'models.html', {**context, 'success': True})
         except Exception as e:
-            return render(request, 'models.html', {'error': str(e)})
+            return render(request, 'models.html', {**context, 'error': str(e)})
+
+    return render(request, 'models.html', context)
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    response = serve(request, path, document_root, show_indexes)
+    # Derivative names are content hashes, so a URL never changes meaning
+    if path.startswith(settings.ARTWORK_DERIVATIVE_ROOT + '/'):
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    return response
+
+# URL extension -> derivative format
+RESIZE_EXTENSIONS = {ext: fmt for fmt, (_, _, ext, _) in FORMATS.items()}
+
+def resized_artwork(request, width, artwork_id, ext):
+    fmt = RESIZE_EXTENSIONS.get(ext)
+    if width not in settings.ARTWORK_RESIZE_WIDTHS or fmt not in available_formats(settings.ARTWORK_DERIVATIVE_QUALITY):
+        raise Http404('Unsupported size or format')
+    artwork = get_object_or_404(Artwork.objects.only('id', 'image', 'image_hash'), id=artwork_id)
+    if not artwork.image:
+        raise Http404('Artwork has no image')
 
-    return render(request, 'models.html') 
\ No newline at end of file
+    response = FileResponse(resize_cache.open_variant(artwork, width, fmt), content_type=FORMATS[fmt][1])
+    patch_cache_control(response, public=True, max_age=86400)
+    return response
@@ -34,6 +34,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'artwork.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -63,11 +64,56 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'portfolio.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite unless MYSQL_DATABASE is set. Connections are kept open between
+# requests and checked before reuse
+CONN_MAX_AGE = int(os.environ.get('DATABASE_CONN_MAX_AGE', 60))
+
+if os.environ.get('MYSQL_DATABASE'):
+    def mysql_database(host):
+        return {
+            # Backend shipped with mysql-connector-python; set MYSQL_ENGINE=django.db.backends.mysql for mysqlclient
+            'ENGINE': os.environ.get('MYSQL_ENGINE', 'mysql.connector.django'),
+            'NAME': os.environ['MYSQL_DATABASE'],
+            'USER': os.environ.get('MYSQL_USER', ''),
+            'PASSWORD': os.environ.get('MYSQL_PASSWORD', ''),
+            'HOST': host,
+            'PORT': os.environ.get('MYSQL_PORT', ''),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'charset': 'utf8mb4'},
+        }
+
+    DATABASES = {'default': mysql_database(os.environ.get('MYSQL_HOST', 'localhost'))}
+    if os.environ.get('MYSQL_REPLICA_HOST'):
+        # Catalog reads go to the replica (see artwork.routers); tests read the primary
+        DATABASES['replica'] = {**mysql_database(os.environ['MYSQL_REPLICA_HOST']), 'TEST': {'MIRROR': 'default'}}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            # A file rather than SQLite's shared in-memory database, which fails concurrent
+            # writers instead of making them wait (artwork.tests races checkouts on threads)
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
     }
+
+DATABASE_ROUTERS = ['artwork.routers.CatalogReplicaRouter'] if 'replica' in DATABASES else []
+# Seconds catalog reads stay on the primary after a catalog or site change, so caches
+# refilled right after it never store the replica's older rows; keep above the replica's lag
+ARTWORK_REPLICA_PIN_SECONDS = 10
+
+# Applied to every new SQLite connection (artwork.signals): WAL lets readers carry on
+# while a sale or upload commits, and NORMAL sync is durable in WAL mode except on power loss
+ARTWORK_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms a writer waits for the lock instead of failing
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,  # KiB
+    'temp_store': 'MEMORY',
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -93,9 +139,72 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic minifies, fingerprints and precompresses (see artwork.storage)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'artwork.storage.PrecompressedManifestStaticFilesStorage'},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Artwork derivatives, stored under content-addressed (immutable) names
+ARTWORK_DERIVATIVE_ROOT = 'artwork/derivatives'
+ARTWORK_DERIVATIVE_WIDTHS = [200, 400, 800, 1600]  # srcset width ladder
+ARTWORK_TILE_WIDTH = 400
+ARTWORK_THUMBNAIL_SIZE = (150, 150)
+# Output formats and their encoder quality; formats Pillow can't encode are skipped
+ARTWORK_DERIVATIVE_QUALITY = {'jpeg': 85, 'webp': 80, 'avif': 60}
+
+# On-demand resizes served from /media/r/<width>/<artwork_id>.<ext>; only
+# these widths are rendered so the endpoint can't be used to burn CPU
+ARTWORK_RESIZE_WIDTHS = [120, 200, 300, 400, 600, 800, 1200, 1600]
+ARTWORK_RESIZE_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'resize')
+ARTWORK_RESIZE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Model application photos: upload limits and the size of the review thumbnails shown in the admin
+MODEL_IMAGE_MAX_FILE_BYTES = 15 * 1024 * 1024
+MODEL_IMAGE_MAX_REQUEST_BYTES = 60 * 1024 * 1024
+MODEL_IMAGE_THUMBNAIL_SIZE = (400, 400)
+
+# Length of each artwork's precomputed similar-artwork list
+ARTWORK_SIMILAR_COUNT = 12
+
+# Shared by every worker process on the host, so version bumps invalidate everywhere.
+# Past MAX_ENTRIES the file cache culls a third of its entries at random; the
+# page cache and its compressed bodies need room, and the version stamps
+# (artwork.cache) get an alias of their own so culling never resets them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'django'),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'versions'),
+    },
+}
+# Cached facet counts are keyed by catalog version; this only bounds their lifetime
+ARTWORK_FACET_CACHE_TIMEOUT = 60 * 60
+# Cached public pages are keyed by URL and invalidated by version bumps; this bounds their lifetime
+ARTWORK_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+# Seconds between checks of the shared site version by each process's config cache
+ARTWORK_CONFIG_CHECK_INTERVAL = 5
+
+# Response compression (artwork.middleware); see `manage.py benchmark_compression`
+ARTWORK_COMPRESS_TYPES = [
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+    'application/json', 'application/xml', 'image/svg+xml',
+]
+ARTWORK_COMPRESS_MIN_BYTES = 1024  # below this the headers outweigh the saving
+ARTWORK_COMPRESS_LEVELS = {'br': 4, 'gzip': 6}  # compressed on every response
+ARTWORK_COMPRESS_CACHED_LEVELS = {'br': 9, 'gzip': 9}  # compressed once per cached page version
+
+# Route the catalog pages and the artwork list API to artwork.async_views;
+# portfolio/asgi.py turns this on, so WSGI workers keep the sync views
+ARTWORK_ASYNC_VIEWS = os.environ.get('ARTWORK_ASYNC_VIEWS') == '1'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
@@ -3,7 +3,10 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
-from artwork import views
+from artwork import async_views, views
+
+if settings.ARTWORK_ASYNC_VIEWS:
+    views = async_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,4 +16,5 @@ urlpatterns = [
     path('commission/', views.commission, name='commission'),
     path('models/', views.models, name='models'),
     path('artwork/<int:artwork_id>/', views.artwork_detail, name='artwork_detail'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) 
\ No newline at end of file
+    path('media/r/<int:width>/<int:artwork_id>.<str:ext>', views.resized_artwork, name='resized_artwork'),
+] + static(settings.MEDIA_URL, view=views.serve_media, document_root=settings.MEDIA_ROOT) 
\ No newline at end of file